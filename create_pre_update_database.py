@@ -9,7 +9,25 @@ allowing us to test the migration process thoroughly.
 import sqlite3
 import os
 from datetime import datetime, timedelta
-import random
+import numpy as np
+
+# Fixture databases are throwaway, so trade durability for speed: WAL with
+# synchronous=NORMAL avoids the double fsync on every commit
+FIXTURE_PRAGMAS = (
+    'journal_mode=WAL',
+    'synchronous=NORMAL',
+    'temp_store=MEMORY',
+    'cache_size=-65536',
+)
+
+# Weight range (kg) per exercise; anything not listed uses DEFAULT_WEIGHT_RANGE
+WEIGHT_RANGES = {
+    "Bench Press": (60, 120),
+    "Squats": (80, 150),
+    "Deadlift": (100, 180),
+    "Running": (0, 0),  # Time-based exercise
+}
+DEFAULT_WEIGHT_RANGE = (20, 100)
 
 def create_pre_update_database(db_path: str = "pre_update_test.db"):
     """Create a database with the old schema and sample data"""
@@ -20,15 +38,16 @@ def create_pre_update_database(db_path: str = "pre_update_test.db"):
     
     # Create connection
     conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
+    for pragma in FIXTURE_PRAGMAS:
+        conn.execute(f'PRAGMA {pragma}')
     
     print(f"Creating pre-update database at: {db_path}")
     
     # Create old schema tables (without user_id columns)
     print("Creating old schema tables...")
     
-    # Weight category table (old schema - no user_id)
-    cursor.execute('''
+    # Both tables in one executescript call (old schema - no user_id)
+    conn.executescript('''
         CREATE TABLE weight_category (
             id INTEGER PRIMARY KEY,
             name VARCHAR(50) NOT NULL UNIQUE,
@@ -36,11 +55,8 @@ def create_pre_update_database(db_path: str = "pre_update_test.db"):
             is_body_weight_exercise BOOLEAN DEFAULT 0,
             created_at DATETIME,
             last_used_at DATETIME
-        )
-    ''')
-    
-    # Weight entry table (old schema - no user_id)
-    cursor.execute('''
+        );
+        
         CREATE TABLE weight_entry (
             id INTEGER PRIMARY KEY,
             weight REAL NOT NULL,
@@ -48,15 +64,9 @@ def create_pre_update_database(db_path: str = "pre_update_test.db"):
             reps INTEGER,
             category_id INTEGER REFERENCES weight_category(id),
             created_at DATETIME
-        )
+        );
     ''')
     
-    # Create indexes
-    cursor.execute('CREATE INDEX IF NOT EXISTS idx_weight_entry_category_id ON weight_entry(category_id)')
-    cursor.execute('CREATE INDEX IF NOT EXISTS idx_weight_entry_created_at ON weight_entry(created_at)')
-    
-    print("Inserting sample categories...")
-    
     # Insert sample categories
     categories = [
         ("Body Mass", 1, 0),  # Body mass category
@@ -70,104 +80,100 @@ def create_pre_update_database(db_path: str = "pre_update_test.db"):
     ]
     
     base_time = datetime.now()
+    rng = np.random.default_rng()
     
-    for i, (name, is_body_mass, is_body_weight_exercise) in enumerate(categories):
-        created_at = base_time - timedelta(days=30-i)
-        last_used_at = base_time - timedelta(days=random.randint(1, 10))
+    # Generate all sample rows inside a single transaction so SQLite only
+    # flushes the journal once instead of once per INSERT
+    with conn:
+        print("Inserting sample categories...")
         
-        cursor.execute('''
+        last_used_offsets = rng.integers(1, 11, len(categories)).tolist()
+        cat_rows = [
+            (
+                name,
+                is_body_mass,
+                is_body_weight_exercise,
+                base_time - timedelta(days=30-i),
+                base_time - timedelta(days=last_used_offsets[i]),
+            )
+            for i, (name, is_body_mass, is_body_weight_exercise) in enumerate(categories)
+        ]
+        conn.executemany('''
             INSERT INTO weight_category (name, is_body_mass, is_body_weight_exercise, created_at, last_used_at)
             VALUES (?, ?, ?, ?, ?)
-        ''', (name, is_body_mass, is_body_weight_exercise, created_at, last_used_at))
-    
-    print("Inserting sample weight entries...")
-    
-    # Get category IDs
-    cursor.execute('SELECT id, name, is_body_mass, is_body_weight_exercise FROM weight_category')
-    category_data = cursor.fetchall()
-    
-    # Generate sample entries for each category
-    entry_count = 0
-    for category_id, category_name, is_body_mass, is_body_weight_exercise in category_data:
-        entries_for_category = random.randint(5, 20)  # 5-20 entries per category
+        ''', cat_rows)
+        
+        print("Inserting sample weight entries...")
+        
+        # Get category IDs
+        category_data = conn.execute('SELECT id, name, is_body_mass, is_body_weight_exercise FROM weight_category').fetchall()
         
-        for i in range(entries_for_category):
-            entry_date = base_time - timedelta(days=random.randint(1, 90))
-            
-            if is_body_mass:
-                # Body mass entries: weight only, no reps
-                weight = random.uniform(70, 90)  # kg
-                unit = 'kg'
-                reps = None
-            elif is_body_weight_exercise:
-                # Body weight exercises: reps only, weight from body mass
-                weight = random.uniform(70, 90)  # Use body weight
-                unit = 'kg'
-                reps = random.randint(5, 30)
-            else:
-                # Regular exercises: both weight and reps
-                if category_name == "Bench Press":
-                    weight = random.uniform(60, 120)
-                elif category_name == "Squats":
-                    weight = random.uniform(80, 150)
-                elif category_name == "Deadlift":
-                    weight = random.uniform(100, 180)
-                elif category_name == "Running":
-                    weight = 0  # Time-based exercise
-                else:
-                    weight = random.uniform(20, 100)
-                
-                unit = 'kg'
-                reps = random.randint(1, 15) if weight > 0 else 1
-            
-            cursor.execute('''
-                INSERT INTO weight_entry (weight, unit, reps, category_id, created_at)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (weight, unit, reps, category_id, entry_date))
-            
-            entry_count += 1
-    
-    print(f"Inserted {entry_count} sample weight entries")
-    
-    # Add some entries without category_id to test migration
-    print("Adding entries without category_id for migration testing...")
-    
-    for i in range(5):
-        entry_date = base_time - timedelta(days=random.randint(1, 30))
-        weight = random.uniform(70, 90)
+        # Generate sample entries for each category, one vectorised draw per column
+        counts = rng.integers(5, 21, len(category_data))  # 5-20 entries per category
+        n_entries = int(counts.sum())
+        category_ids = np.repeat([row[0] for row in category_data], counts)
+        body_mass_mask = np.repeat([bool(row[2]) for row in category_data], counts)
+        body_weight_mask = np.repeat([bool(row[3]) for row in category_data], counts)
         
-        cursor.execute('''
+        # Regular exercises: both weight and reps, drawn from the per-category range
+        ranges = np.repeat([WEIGHT_RANGES.get(row[1], DEFAULT_WEIGHT_RANGE) for row in category_data], counts, axis=0)
+        weights = rng.uniform(ranges[:, 0], ranges[:, 1])
+        reps = np.where(weights > 0, rng.integers(1, 16, n_entries), 1)
+        
+        # Body mass entries (weight only) and body weight exercises (weight from body mass)
+        weights = np.where(body_mass_mask | body_weight_mask, rng.uniform(70, 90, n_entries), weights)
+        reps = np.where(body_weight_mask, rng.integers(5, 31, n_entries), reps)
+        
+        # Convert to Python types for sqlite3; body mass entries have no reps
+        # Dates are computed as one datetime64 array and rendered in the
+        # 'YYYY-MM-DD HH:MM:SS.ffffff' form the old app stored
+        day_offsets = rng.integers(1, 91, n_entries).astype('timedelta64[D]')
+        entry_dates = np.datetime64(base_time, 'us') - day_offsets
+        entry_dates = np.char.replace(np.datetime_as_string(entry_dates, unit='us'), 'T', ' ').tolist()
+        entry_reps = [None if is_body_mass else r for is_body_mass, r in zip(body_mass_mask.tolist(), reps.tolist())]
+        entry_rows = list(zip(weights.tolist(), ['kg'] * n_entries, entry_reps, category_ids.tolist(), entry_dates))
+        
+        print(f"Generated {len(entry_rows)} sample weight entries")
+        
+        # Add some entries without category_id to test migration
+        print("Adding entries without category_id for migration testing...")
+        entry_rows.extend(
+            (weight, 'kg', None, None, base_time - timedelta(days=days))
+            for weight, days in zip(rng.uniform(70, 90, 5).tolist(), rng.integers(1, 31, 5).tolist())
+        )
+        
+        # Add some problematic data to test edge cases
+        print("Adding edge case data...")
+        
+        # Entry with zero weight (should be caught by validation)
+        entry_rows.append((0.0, 'kg', 1, 1, base_time - timedelta(days=1)))
+        # Entry with very high reps
+        entry_rows.append((50.0, 'kg', 100, 2, base_time - timedelta(days=2)))
+        
+        conn.executemany('''
             INSERT INTO weight_entry (weight, unit, reps, category_id, created_at)
             VALUES (?, ?, ?, ?, ?)
-        ''', (weight, 'kg', None, None, entry_date))
-    
-    # Add some problematic data to test edge cases
-    print("Adding edge case data...")
-    
-    # Entry with zero weight (should be caught by validation)
-    cursor.execute('''
-        INSERT INTO weight_entry (weight, unit, reps, category_id, created_at)
-        VALUES (?, ?, ?, ?, ?)
-    ''', (0.0, 'kg', 1, 1, base_time - timedelta(days=1)))
-    
-    # Entry with very high reps
-    cursor.execute('''
-        INSERT INTO weight_entry (weight, unit, reps, category_id, created_at)
-        VALUES (?, ?, ?, ?, ?)
-    ''', (50.0, 'kg', 100, 2, base_time - timedelta(days=2)))
-    
-    # Commit changes
-    conn.commit()
+        ''', entry_rows)
+    
+    print(f"Inserted {len(entry_rows)} weight entries in a single transaction")
+    
+    # Create indexes once the data is loaded - building each index in one pass
+    # is cheaper than maintaining it on every INSERT
+    # Gather planner statistics afterwards so queries against the fixture pick
+    # indexes the same way every run
+    print("Creating indexes...")
+    conn.executescript('''
+        CREATE INDEX IF NOT EXISTS idx_weight_entry_category_id ON weight_entry(category_id);
+        CREATE INDEX IF NOT EXISTS idx_weight_entry_created_at ON weight_entry(created_at);
+        ANALYZE;
+    ''')
     
     # Print summary
-    cursor.execute('SELECT COUNT(*) FROM weight_category')
-    category_count = cursor.fetchone()[0]
+    category_count = conn.execute('SELECT COUNT(*) FROM weight_category').fetchone()[0]
     
-    cursor.execute('SELECT COUNT(*) FROM weight_entry')
-    entry_count = cursor.fetchone()[0]
+    entry_count = conn.execute('SELECT COUNT(*) FROM weight_entry').fetchone()[0]
     
-    cursor.execute('SELECT COUNT(*) FROM weight_entry WHERE category_id IS NULL')
-    null_category_count = cursor.fetchone()[0]
+    null_category_count = conn.execute('SELECT COUNT(*) FROM weight_entry WHERE category_id IS NULL').fetchone()[0]
     
     print(f"\nDatabase created successfully!")
     print(f"Categories: {category_count}")
@@ -176,7 +182,7 @@ def create_pre_update_database(db_path: str = "pre_update_test.db"):
     
     # Verify data integrity
     print("\nData integrity check:")
-    cursor.execute('''
+    category_counts = conn.execute('''
         SELECT wc.name, COUNT(we.id) as entry_count
         FROM weight_category wc
         LEFT JOIN weight_entry we ON wc.id = we.category_id
@@ -184,7 +190,7 @@ def create_pre_update_database(db_path: str = "pre_update_test.db"):
         ORDER BY entry_count DESC
     ''')
     
-    for category_name, count in cursor.fetchall():
+    for category_name, count in category_counts:
         print(f"  {category_name}: {count} entries")
     
     conn.close()
@@ -0,0 +1,28 @@
+"""
+Gunicorn configuration for running the Weight Tracker with multiple workers
+
+    gunicorn -c gunicorn.conf.py 'src.app:create_app()'
+
+The app is created once in the master before forking, so database
+migrations and schema verification run once instead of once per worker.
+"""
+
+import os
+
+# Workers can't share a rotating log file; log to stdout only and leave
+# collection/rotation to the container runtime
+os.environ.setdefault('LOG_TO_FILE', 'false')
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 8080)}"
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+preload_app = True
+
+
+def post_fork(server, worker):
+    """Drop pooled SQLite connections inherited from the master"""
+    from src.models import db
+
+    # SQLite connections must not be shared across processes; close=False
+    # leaves the master's connections alone and gives the worker a fresh pool
+    with server.app.callable.app_context():
+        db.engine.dispose(close=False)
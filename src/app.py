@@ -1,23 +1,58 @@
-from flask import Flask, send_from_directory
+from flask import Flask, send_file
+from sqlalchemy import event, text
+import atexit
+import hashlib
 import os
 import logging
 from logging.handlers import RotatingFileHandler
 import sys
+import weakref
 from .models import db
 from .routes import main as main_blueprint, api
 from .auth_routes import auth_bp
 from .auth import init_login
-from . import services
-from . import migration
 from pathlib import Path
+from contextlib import contextmanager
 import threading
 import secrets
 
+# Applied to every new SQLite connection opened by the engine's pool
+SQLITE_PRAGMAS = (
+    'journal_mode=WAL',
+    'synchronous=NORMAL',
+    'busy_timeout=5000',  # wait for a competing writer instead of SQLITE_BUSY
+    'mmap_size=268435456',  # 256MB - read pages via mmap instead of copying
+    'cache_size=-65536',  # 64MB
+    'temp_store=MEMORY',
+)
+
+# Directories already created by this process; skips the mkdir syscall when
+# apps are created repeatedly (e.g. once per test)
+_made_dirs = set()
+
+# Latest app per database file, optimized by the single atexit hook, and
+# the pid of the process that registered it
+_optimize_apps = {}
+_optimize_pid = None
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None
+
+try:
+    from whitenoise import WhiteNoise
+except ImportError:  # pragma: no cover - fall back to Flask's static view
+    WhiteNoise = None
+
 def create_app(test_config=None):
     """Application factory function"""
+    # Read the environment once so configuration is consistent for this app
+    env = dict(os.environ)
+    
     # Set custom instance path to a directory we can write to
-    instance_path = os.environ.get('INSTANCE_PATH', os.path.join(os.getcwd(), 'instance'))
-    os.makedirs(instance_path, exist_ok=True)
+    instance_path = env.get('INSTANCE_PATH', os.path.join(os.getcwd(), 'instance'))
+    _ensure_dir(instance_path)
     
     app = Flask(__name__, instance_path=instance_path)
     
@@ -25,23 +60,31 @@ def create_app(test_config=None):
     if test_config is None:
         # Default configuration
         # Use DATABASE_PATH environment variable if set, otherwise use default
-        db_path = os.environ.get('DATABASE_PATH', 'weight_tracker.db')
+        db_path = env.get('DATABASE_PATH', 'weight_tracker.db')
         app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
-        app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+        # Keep Flask-SQLAlchemy's per-session and per-query hooks switched off
+        app.config.update({
+            'SQLALCHEMY_TRACK_MODIFICATIONS': False,
+            'SQLALCHEMY_RECORD_QUERIES': False,
+            'SQLALCHEMY_ECHO': False,
+            'SQLALCHEMY_ENGINE_OPTIONS': {
+                'connect_args': {'check_same_thread': False},
+            },
+        })
         
         # Authentication configuration
-        app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY') or secrets.token_hex(32)
+        app.config['SECRET_KEY'] = env.get('SECRET_KEY') or secrets.token_hex(32)
         app.config['WTF_CSRF_ENABLED'] = True
         app.config['WTF_CSRF_TIME_LIMIT'] = 3600  # 1 hour
         
         # Session configuration for security
-        app.config['SESSION_COOKIE_SECURE'] = os.environ.get('HTTPS', 'false').lower() == 'true'
+        app.config['SESSION_COOKIE_SECURE'] = env.get('HTTPS', 'false').lower() == 'true'
         app.config['SESSION_COOKIE_HTTPONLY'] = True
         app.config['SESSION_COOKIE_SAMESITE'] = 'Lax'
         app.config['PERMANENT_SESSION_LIFETIME'] = 86400  # 24 hours
         
         # Development mode flag for password reset tokens
-        app.config['DEVELOPMENT'] = os.environ.get('FLASK_ENV') == 'development'
+        app.config['DEVELOPMENT'] = env.get('FLASK_ENV') == 'development'
     else:
         # Test configuration
         app.config.update(test_config)
@@ -52,10 +95,12 @@ def create_app(test_config=None):
             app.config['WTF_CSRF_ENABLED'] = False  # Disable CSRF for tests
     
     # Set up logging
-    configure_logging(app)
+    configure_logging(app, env)
     
     # Initialize extensions
     db.init_app(app)
+    with app.app_context():
+        event.listen(db.engine, 'connect', _set_sqlite_pragmas)
     
     # Initialize Flask-Login
     init_login(app)
@@ -65,55 +110,189 @@ def create_app(test_config=None):
     app.register_blueprint(api)
     app.register_blueprint(auth_bp)
     
+    db_path = app.config['SQLALCHEMY_DATABASE_URI'].replace('sqlite:///', '')
+    
     # Create database tables and migrate if needed (skip in test mode)
     if not app.config.get('SKIP_MIGRATION', False):
-        with app.app_context():
-            app.logger.info("Checking database and performing migrations if needed")
-            
-            # First verify if this is a mounted DB from a previous version that needs migration
-            db_path = app.config['SQLALCHEMY_DATABASE_URI'].replace('sqlite:///', '')
-            if os.path.exists(db_path):
-                app.logger.info(f"Found existing database at {db_path}")
-                
-                # First run migration checks (handles older database versions)
-                app.logger.info("Running migration checks for existing database")
-                migration.check_and_migrate_database()
-                
-                # Then create any additional tables if needed
-                app.logger.info("Creating any missing tables")
-                services.create_tables()
+        # Serialise startup across worker processes; only the first one to see
+        # an unverified database runs the migration checks
+        with _schema_check_lock(app.instance_path):
+            sentinel = _schema_sentinel_path(app.instance_path, db_path)
+            if sentinel is not None and sentinel.exists():
+                app.logger.info(f"Schema already verified for {db_path}, skipping migration checks")
             else:
-                # If database doesn't exist, create it from scratch
-                app.logger.info("No existing database found, creating tables from scratch")
-                # For new databases, the migration system handles both table creation and setup
-                migration.check_and_migrate_database()
-        
-        # Migrate old entries to the new schema (only needed for existing databases)
-        # For new databases, this is handled by the migration system
-        if db_path != ":memory:" and os.path.exists(db_path):
-            services.migrate_old_entries_to_body_mass()
-        
-        # Verify schema is consistent
-        schema_verification = migration.verify_model_schema()
-        for table, is_valid in schema_verification.items():
-            if not is_valid:
-                app.logger.warning(f"Schema mismatch detected for table {table}")
-    
-    # Add service worker route - needed for PWA
-    @app.route('/static/<path:path>')
-    def send_static(path):
-        return send_from_directory('static', path)
-        
-    @app.route('/manifest.json')
-    def manifest():
-        return send_from_directory('static', 'manifest.json')
+                _run_startup_migrations(app, db_path)
+                _mark_schema_verified(app.instance_path, db_path)
+                app.logger.info(f"Schema checks and migrations performed by pid {os.getpid()}")
+    
+    # Keep query planner statistics fresh for long-lived databases
+    if not app.config.get('TESTING', False):
+        _register_shutdown_optimize(app, db_path)
+    
+    # Serve /static (manifest, service worker, icons) from the WSGI layer so
+    # these per-page-load requests never reach a Flask view
+    manifest_path = os.path.join(app.static_folder, 'manifest.json')
+    if WhiteNoise is not None:
+        app.wsgi_app = WhiteNoise(app.wsgi_app, root=app.static_folder, prefix='static/')
+        # Also answer the root /manifest.json URL without a Flask view
+        app.wsgi_app.add_file_to_dictionary('/manifest.json', manifest_path)
+    else:
+        @app.route('/manifest.json')
+        def manifest():
+            return send_file(manifest_path)
     
     return app
 
-def configure_logging(app):
+def _ensure_dir(path):
+    """Create a directory (and parents) once per process"""
+    # Keyed on the absolute path: a relative one (e.g. the default LOG_DIR)
+    # names a different directory after a chdir
+    path = os.path.abspath(path)
+    if path not in _made_dirs:
+        os.makedirs(path, exist_ok=True)
+        _made_dirs.add(path)
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """Configure each pooled SQLite connection as it is opened"""
+    cursor = dbapi_connection.cursor()
+    try:
+        for pragma in SQLITE_PRAGMAS:
+            cursor.execute(f'PRAGMA {pragma}')
+    finally:
+        cursor.close()
+
+def _run_startup_migrations(app, db_path):
+    """Create database tables, run migrations and verify the schema"""
+    from . import services, migration
+    
+    with app.app_context():
+        app.logger.info("Checking database and performing migrations if needed")
+        
+        # First verify if this is a mounted DB from a previous version that needs migration
+        if os.path.exists(db_path):
+            app.logger.info(f"Found existing database at {db_path}")
+            
+            # First run migration checks (handles older database versions)
+            app.logger.info("Running migration checks for existing database")
+            migration.check_and_migrate_database()
+            
+            # Then create any additional tables if needed
+            app.logger.info("Creating any missing tables")
+            services.create_tables()
+        else:
+            # If database doesn't exist, create it from scratch
+            app.logger.info("No existing database found, creating tables from scratch")
+            # For new databases, the migration system handles both table creation and setup
+            migration.check_and_migrate_database()
+    
+    # Migrate old entries to the new schema (only needed for existing databases)
+    # For new databases, this is handled by the migration system
+    if db_path != ":memory:" and os.path.exists(db_path):
+        services.migrate_old_entries_to_body_mass()
+    
+    # Verify schema is consistent
+    schema_verification = migration.verify_model_schema()
+    for table, is_valid in schema_verification.items():
+        if not is_valid:
+            app.logger.warning(f"Schema mismatch detected for table {table}")
+
+def _resolve_db_file(instance_path, db_path):
+    """Resolve a SQLite database path the same way Flask-SQLAlchemy does"""
+    if db_path == ':memory:' or db_path.startswith('file:'):
+        return None
+    if os.path.isabs(db_path):
+        return db_path
+    return os.path.join(instance_path, db_path)
+
+def _schema_sentinel_path(instance_path, db_path):
+    """Sentinel file marking the database as migrated
+    
+    Named after the database file, so apps sharing an instance folder keep
+    separate sentinels; keyed on the schema version the code migrates to, so
+    an upgrade that adds a migration always runs it, and on the file's inode,
+    size and mtime so that replacing or modifying the database (e.g. mounting
+    an older copy) invalidates it.
+    """
+    from .migration import CURRENT_SCHEMA_VERSION
+    
+    db_file = _resolve_db_file(instance_path, db_path)
+    if db_file is None or not os.path.exists(db_file):
+        return None
+    stat = os.stat(db_file)
+    return Path(instance_path) / (
+        f'{_schema_sentinel_prefix(db_file)}'
+        f'v{CURRENT_SCHEMA_VERSION}_{stat.st_ino}_{stat.st_size}_{stat.st_mtime_ns}'
+    )
+
+def _schema_sentinel_prefix(db_file):
+    """Sentinel name prefix shared by every sentinel for one database file"""
+    digest = hashlib.sha1(os.path.abspath(db_file).encode()).hexdigest()[:12]
+    return f'.schema_ok_{digest}_'
+
+def _mark_schema_verified(instance_path, db_path):
+    """Record that the current database file has been migrated and verified"""
+    sentinel = _schema_sentinel_path(instance_path, db_path)
+    if sentinel is None:
+        return
+    # Sentinels for older versions of this file are no longer valid; other
+    # databases' sentinels are left alone
+    prefix = _schema_sentinel_prefix(_resolve_db_file(instance_path, db_path))
+    for stale in Path(instance_path).glob(f'{prefix}*'):
+        if stale != sentinel:
+            stale.unlink(missing_ok=True)
+    sentinel.touch()
+
+def _register_shutdown_optimize(app, db_path):
+    """Run PRAGMA optimize on the database when the process exits"""
+    db_file = _resolve_db_file(app.instance_path, db_path)
+    if db_file is None:
+        return
+    
+    # One atexit hook per process; apps are held weakly so repeated
+    # create_app() calls neither pile up hooks nor keep old apps alive
+    global _optimize_pid
+    if not _optimize_apps:
+        atexit.register(_optimize_on_shutdown)
+        _optimize_pid = os.getpid()
+    _optimize_apps[db_file] = weakref.ref(app)
+
+def _optimize_on_shutdown():
+    """atexit hook: PRAGMA optimize each database whose app is still alive"""
+    # Forked workers (gunicorn with preload_app) inherit the hook; only the
+    # process that registered it optimizes
+    if os.getpid() != _optimize_pid:
+        return
+    for app_ref in _optimize_apps.values():
+        app = app_ref()
+        if app is None:
+            continue
+        try:
+            with app.app_context():
+                with db.engine.begin() as connection:
+                    connection.execute(text("PRAGMA optimize"))
+        except Exception as e:
+            app.logger.warning(f"PRAGMA optimize at shutdown failed: {str(e)}")
+
+@contextmanager
+def _schema_check_lock(instance_path):
+    """Hold an exclusive file lock while checking/migrating the schema"""
+    if fcntl is None:
+        yield
+        return
+    with open(os.path.join(instance_path, '.schema_check.lock'), 'w') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+def configure_logging(app, env=None):
     """Configure logging for the application"""
+    if env is None:
+        env = os.environ
+    
     # Set log level based on environment
-    log_level = os.environ.get('LOG_LEVEL', 'INFO')
+    log_level = env.get('LOG_LEVEL', 'INFO')
     numeric_level = getattr(logging, log_level.upper(), None)
     if not isinstance(numeric_level, int):
         numeric_level = logging.INFO
@@ -127,10 +306,14 @@ def configure_logging(app):
         ]
     )
     
-    # Create a file handler if not in debug mode
-    if not app.debug:
-        log_dir = os.environ.get('LOG_DIR', 'logs')
-        os.makedirs(log_dir, exist_ok=True)
+    # Create a file handler if not in debug mode. Forked gunicorn workers
+    # can't share a RotatingFileHandler (after one rotates, the others keep
+    # writing to the renamed file), so gunicorn.conf.py turns this off and
+    # logs go to stdout only
+    log_to_file = env.get('LOG_TO_FILE', 'true').lower() == 'true'
+    if not app.debug and log_to_file:
+        log_dir = env.get('LOG_DIR', 'logs')
+        _ensure_dir(log_dir)
         file_handler = RotatingFileHandler(
             os.path.join(log_dir, 'weight_tracker.log'), 
             maxBytes=10485760,  # 10MB
@@ -1,8 +1,9 @@
-from flask import current_app
-from flask_login import LoginManager, current_user
+from flask import current_app, redirect, url_for
+from flask_login import LoginManager, current_user, login_required as flask_login_required
 from functools import wraps
 from typing import Optional
 
+from src.models import db
 from src.models.user import User
 
 # Initialize Flask-Login
@@ -23,24 +24,25 @@ def init_login(app):
 @login_manager.user_loader
 def load_user(user_id: str) -> Optional[User]:
     """Load user by ID for Flask-Login"""
+    # Flask-Login caches the result on g for the rest of the request;
+    # Session.get also checks the identity map before querying
     try:
-        return User.query.get(int(user_id))
+        return db.session.get(User, int(user_id))
     except (ValueError, TypeError):
         return None
 
 def login_required(func):
     """Custom login required decorator with better error handling"""
+    # Wrap with Flask-Login's decorator once, not on every request
+    protected = flask_login_required(func)
+    
     @wraps(func)
     def wrapper(*args, **kwargs):
-        from flask import current_app
-        from flask_login import login_required as flask_login_required
-        
         # Skip authentication in test mode
         if current_app.config.get('TESTING', False):
             return func(*args, **kwargs)
         
-        # Use Flask-Login's built-in decorator
-        return flask_login_required(func)(*args, **kwargs)
+        return protected(*args, **kwargs)
     
     return wrapper
 
@@ -48,9 +50,6 @@ def anonymous_required(func):
     """Decorator to ensure user is NOT logged in (for login/register pages)"""
     @wraps(func)
     def wrapper(*args, **kwargs):
-        from flask import redirect, url_for
-        from flask_login import current_user
-        
         if current_user.is_authenticated:
             return redirect(url_for('main.index'))
         
@@ -60,15 +59,12 @@ def anonymous_required(func):
 
 def get_current_user() -> Optional[User]:
     """Get the current authenticated user"""
-    from flask_login import current_user
-    
     if current_user.is_authenticated:
         return current_user
     return None
 
 def is_authenticated() -> bool:
     """Check if the current user is authenticated"""
-    from flask_login import current_user
     return current_user.is_authenticated
 
 def require_user_ownership(user_id: int) -> bool:
@@ -80,8 +76,6 @@ def require_user_ownership(user_id: int) -> bool:
 
 def get_user_id() -> Optional[int]:
     """Get the current user's ID or None if not authenticated"""
-    from flask import current_app
-    
     # In test mode, return default user ID (1)
     if current_app.config.get('TESTING', False):
         return 1
@@ -1,15 +1,35 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app
 from flask_login import login_user, logout_user, current_user
+from werkzeug.security import generate_password_hash, check_password_hash
+from sqlalchemy import delete
 from datetime import datetime, UTC
 
 from src.models import db
-from src.models.user import User
+from src.models.user import User, PASSWORD_HASH_METHOD
 from src.forms import LoginForm, RegistrationForm, PasswordResetRequestForm, PasswordResetForm, ChangePasswordForm, ChangeUsernameForm, ChangeEmailForm
 from src.auth import anonymous_required, login_required, get_user_id
 
 # Create authentication blueprint
 auth_bp = Blueprint('auth', __name__, url_prefix='/auth')
 
+# Hash checked against when a login names no account, so unknown usernames
+# cost the same password verification as known ones
+_DUMMY_PASSWORD_HASH = generate_password_hash('x' * 12, method=PASSWORD_HASH_METHOD)
+
+# Normalisation browsers apply to a redirect target before resolving it
+_NEXT_URL_BROWSER_FIXUPS = str.maketrans('\\', '/', '\t\n\r')
+
+def _safe_next_url(target):
+    """Return target if it is a path on this site, otherwise None"""
+    if not target:
+        return None
+    # Browsers read backslashes as slashes and drop tabs/newlines, so
+    # '/\evil.com' and '/\t/evil.com' both lead to '//evil.com'
+    normalised = target.translate(_NEXT_URL_BROWSER_FIXUPS)
+    if not normalised.startswith('/') or normalised.startswith('//'):
+        return None
+    return target
+
 @auth_bp.route('/login', methods=['GET', 'POST'])
 @anonymous_required
 def login():
@@ -20,7 +40,14 @@ def login():
         # Find user by username or email
         user = User.find_by_username_or_email(form.login.data)
         
-        if user and user.check_password(form.password.data) and user.is_active:
+        # Always verify a password hash so the response time doesn't reveal
+        # whether the account exists
+        if user:
+            password_ok = user.check_password(form.password.data)
+        else:
+            password_ok = check_password_hash(_DUMMY_PASSWORD_HASH, form.password.data)
+        
+        if user and password_ok and user.is_active:
             # Log the user in
             login_user(user, remember=form.remember_me.data)
             
@@ -29,9 +56,7 @@ def login():
             db.session.commit()
             
             # Get next page or redirect to index
-            next_page = request.args.get('next')
-            if not next_page or not next_page.startswith('/'):
-                next_page = url_for('main.index')
+            next_page = _safe_next_url(request.args.get('next')) or url_for('main.index')
             
             flash(f'Welcome back, {user.username}!', 'success')
             return redirect(next_page)
@@ -51,16 +76,21 @@ def register():
     
     if form.validate_on_submit():
         try:
+            # One timestamp for every row written by this registration
+            now = datetime.now(UTC)
+            
             # Create new user
             user = User(
                 username=form.username.data,
-                email=form.email.data
+                email=form.email.data,
+                created_at=now
             )
-            user.set_password(form.password.data)
+            user.set_password(form.password.data, now=now)
+            user.update_last_login(now=now)
             
-            # Add to database
+            # Flush to assign user.id; everything below commits as one transaction
             db.session.add(user)
-            db.session.commit()
+            db.session.flush()
             
             # Create default "Body Mass" category for the new user
             from src.models import WeightCategory
@@ -69,7 +99,7 @@ def register():
                 is_body_mass=True,
                 is_body_weight_exercise=False,
                 user_id=user.id,
-                created_at=datetime.now(UTC)
+                created_at=now
             )
             db.session.add(body_mass_category)
             db.session.commit()
@@ -78,8 +108,6 @@ def register():
             
             # Automatically log in the new user
             login_user(user)
-            user.update_last_login()
-            db.session.commit()
             
             return redirect(url_for('main.index'))
             
@@ -271,21 +299,22 @@ def change_email():
 def delete_account():
     """Delete user account (requires confirmation)"""
     try:
-        user_id = current_user.id
-        username = current_user.username
+        # Keep the already-loaded user; current_user becomes anonymous on logout
+        user = current_user._get_current_object()
+        username = user.username
         
         # Log out the user first
         logout_user()
         
-        # Delete user and all associated data (cascading deletes will handle entries and categories)
-        user = User.query.get(user_id)
-        if user:
-            db.session.delete(user)
-            db.session.commit()
-            
-            flash(f'Account "{username}" has been deleted successfully.', 'info')
-        else:
-            flash('Account not found.', 'error')
+        # Delete user and all associated data with one statement per table,
+        # children first, rather than loading and deleting each row via the ORM
+        from src.models import WeightCategory, WeightEntry
+        db.session.execute(delete(WeightEntry).where(WeightEntry.user_id == user.id))
+        db.session.execute(delete(WeightCategory).where(WeightCategory.user_id == user.id))
+        db.session.execute(delete(User).where(User.id == user.id))
+        db.session.commit()
+        
+        flash(f'Account "{username}" has been deleted successfully.', 'info')
             
     except Exception as e:
         db.session.rollback()
@@ -1,9 +1,60 @@
+from flask import current_app
+from flask_login import current_user
 from flask_wtf import FlaskForm
 from wtforms import StringField, PasswordField, BooleanField, SubmitField
 from wtforms.validators import DataRequired, Email, EqualTo, Length, ValidationError
 from email_validator import validate_email, EmailNotValidError
+from functools import lru_cache
 
+from src.models import db
 from src.models.user import User
+from src.auth import get_user_id
+
+def _get_form_user():
+    """User whose account a form is changing (the default user in test mode)"""
+    if current_app.config.get('TESTING', False):
+        user_id = get_user_id()
+        return db.session.get(User, user_id) if user_id else None
+    if current_user.is_authenticated:
+        return current_user
+    return None
+
+def _user_exists(**filters):
+    """Check for a matching user via the unique index, without loading the row"""
+    return db.session.query(User.id).filter_by(**filters).first() is not None
+
+def _is_valid_email(address):
+    """Syntax-only email check; deliverability (DNS) lookups would block the request"""
+    # Cheap prefilter so obvious junk never reaches email-validator or the cache
+    if '@' not in address or len(address) > 120:
+        return False
+    return _parse_email(address)
+
+@lru_cache(maxsize=4096)
+def _parse_email(address):
+    """Memoised email-validator syntax check"""
+    try:
+        validate_email(address, check_deliverability=False)
+    except EmailNotValidError:
+        return False
+    return True
+
+def validate_current_password(password):
+    """Require the password to match the current user's password"""
+    user = _get_form_user()
+    if user and not user.check_password(password):
+        raise ValidationError('Current password is incorrect.')
+
+def validate_password_complexity(pwd):
+    """Require at least one uppercase letter, lowercase letter and digit"""
+    # map() keeps each scan in C and, unlike [A-Z]-style regexes, still
+    # accepts non-ASCII letters and digits
+    if not any(map(str.isupper, pwd)):
+        raise ValidationError('Password must contain at least one uppercase letter.')
+    if not any(map(str.islower, pwd)):
+        raise ValidationError('Password must contain at least one lowercase letter.')
+    if not any(map(str.isdigit, pwd)):
+        raise ValidationError('Password must contain at least one number.')
 
 class LoginForm(FlaskForm):
     """Form for user login"""
@@ -40,38 +91,27 @@ class RegistrationForm(FlaskForm):
     
     def validate_username(self, username):
         """Validate that username is unique"""
-        user = User.query.filter_by(username=username.data).first()
-        if user:
+        if _user_exists(username=username.data):
             raise ValidationError('Username already exists. Please choose a different username.')
     
     def validate_email(self, email):
         """Validate that email is unique and properly formatted"""
+        # Field validators (Email, Length) already rejected it; skip the
+        # email-validator parse and the database lookups
+        if email.errors:
+            return
+        
         # First validate email format using email-validator
-        try:
-            validate_email(email.data)
-        except EmailNotValidError:
+        if not _is_valid_email(email.data):
             raise ValidationError('Please enter a valid email address.')
         
         # Then check if email is already in use
-        user = User.query.filter_by(email=email.data).first()
-        if user:
+        if _user_exists(email=email.data):
             raise ValidationError('Email already registered. Please use a different email address.')
     
     def validate_password(self, password):
         """Validate password complexity"""
-        pwd = password.data
-        
-        # Check for at least one uppercase letter
-        if not any(c.isupper() for c in pwd):
-            raise ValidationError('Password must contain at least one uppercase letter.')
-        
-        # Check for at least one lowercase letter
-        if not any(c.islower() for c in pwd):
-            raise ValidationError('Password must contain at least one lowercase letter.')
-        
-        # Check for at least one digit
-        if not any(c.isdigit() for c in pwd):
-            raise ValidationError('Password must contain at least one number.')
+        validate_password_complexity(password.data)
 
 class PasswordResetRequestForm(FlaskForm):
     """Form for requesting password reset"""
@@ -83,8 +123,7 @@ class PasswordResetRequestForm(FlaskForm):
     
     def validate_email(self, email):
         """Validate that email exists in the system"""
-        user = User.query.filter_by(email=email.data).first()
-        if not user:
+        if not _user_exists(email=email.data):
             raise ValidationError('No account found with that email address.')
 
 class PasswordResetForm(FlaskForm):
@@ -101,19 +140,7 @@ class PasswordResetForm(FlaskForm):
     
     def validate_password(self, password):
         """Validate password complexity"""
-        pwd = password.data
-        
-        # Check for at least one uppercase letter
-        if not any(c.isupper() for c in pwd):
-            raise ValidationError('Password must contain at least one uppercase letter.')
-        
-        # Check for at least one lowercase letter
-        if not any(c.islower() for c in pwd):
-            raise ValidationError('Password must contain at least one lowercase letter.')
-        
-        # Check for at least one digit
-        if not any(c.isdigit() for c in pwd):
-            raise ValidationError('Password must contain at least one number.')
+        validate_password_complexity(password.data)
 
 class ChangePasswordForm(FlaskForm):
     """Form for changing password when logged in"""
@@ -132,37 +159,11 @@ class ChangePasswordForm(FlaskForm):
     
     def validate_new_password(self, new_password):
         """Validate password complexity"""
-        pwd = new_password.data
-        
-        # Check for at least one uppercase letter
-        if not any(c.isupper() for c in pwd):
-            raise ValidationError('Password must contain at least one uppercase letter.')
-        
-        # Check for at least one lowercase letter
-        if not any(c.islower() for c in pwd):
-            raise ValidationError('Password must contain at least one lowercase letter.')
-        
-        # Check for at least one digit
-        if not any(c.isdigit() for c in pwd):
-            raise ValidationError('Password must contain at least one number.')
+        validate_password_complexity(new_password.data)
     
     def validate_current_password(self, current_password):
         """Validate that current password is correct"""
-        from flask_login import current_user
-        from flask import current_app
-        from src.auth import get_user_id
-        
-        # Get current user (handle test mode)
-        if current_app.config.get('TESTING', False):
-            user_id = get_user_id()
-            if user_id:
-                test_user = User.query.get(user_id)
-                if test_user and not test_user.check_password(current_password.data):
-                    raise ValidationError('Current password is incorrect.')
-        else:
-            if current_user.is_authenticated:
-                if not current_user.check_password(current_password.data):
-                    raise ValidationError('Current password is incorrect.')
+        validate_current_password(current_password.data)
 
 class ChangeUsernameForm(FlaskForm):
     """Form for changing username"""
@@ -177,44 +178,17 @@ class ChangeUsernameForm(FlaskForm):
     
     def validate_new_username(self, new_username):
         """Validate that new username is unique and different from current"""
-        from flask_login import current_user
-        from flask import current_app
-        from src.auth import get_user_id
-        
-        # Get current user (handle test mode)
-        if current_app.config.get('TESTING', False):
-            user_id = get_user_id()
-            if user_id:
-                test_user = User.query.get(user_id)
-                if test_user and test_user.username == new_username.data:
-                    raise ValidationError('New username must be different from current username.')
-        else:
-            # Check if username is different from current
-            if current_user.is_authenticated and current_user.username == new_username.data:
-                raise ValidationError('New username must be different from current username.')
+        user = _get_form_user()
+        if user and user.username == new_username.data:
+            raise ValidationError('New username must be different from current username.')
         
         # Check if username is unique
-        user = User.query.filter_by(username=new_username.data).first()
-        if user:
+        if _user_exists(username=new_username.data):
             raise ValidationError('Username already exists. Please choose a different username.')
     
     def validate_current_password(self, current_password):
         """Validate that current password is correct"""
-        from flask_login import current_user
-        from flask import current_app
-        from src.auth import get_user_id
-        
-        # Get current user (handle test mode)
-        if current_app.config.get('TESTING', False):
-            user_id = get_user_id()
-            if user_id:
-                test_user = User.query.get(user_id)
-                if test_user and not test_user.check_password(current_password.data):
-                    raise ValidationError('Current password is incorrect.')
-        else:
-            if current_user.is_authenticated:
-                if not current_user.check_password(current_password.data):
-                    raise ValidationError('Current password is incorrect.')
+        validate_current_password(current_password.data)
 
 class ChangeEmailForm(FlaskForm):
     """Form for changing email address"""
@@ -230,47 +204,23 @@ class ChangeEmailForm(FlaskForm):
     
     def validate_new_email(self, new_email):
         """Validate that new email is unique, properly formatted, and different from current"""
-        from flask_login import current_user
-        from flask import current_app
-        from src.auth import get_user_id
+        # Field validators (Email, Length) already rejected it; skip the
+        # email-validator parse and the database lookups
+        if new_email.errors:
+            return
         
         # First validate email format using email-validator
-        try:
-            validate_email(new_email.data)
-        except EmailNotValidError:
+        if not _is_valid_email(new_email.data):
             raise ValidationError('Please enter a valid email address.')
         
-        # Get current user (handle test mode)
-        if current_app.config.get('TESTING', False):
-            user_id = get_user_id()
-            if user_id:
-                test_user = User.query.get(user_id)
-                if test_user and test_user.email == new_email.data:
-                    raise ValidationError('New email must be different from current email.')
-        else:
-            # Check if email is different from current
-            if current_user.is_authenticated and current_user.email == new_email.data:
-                raise ValidationError('New email must be different from current email.')
+        user = _get_form_user()
+        if user and user.email == new_email.data:
+            raise ValidationError('New email must be different from current email.')
         
         # Check if email is unique
-        user = User.query.filter_by(email=new_email.data).first()
-        if user:
+        if _user_exists(email=new_email.data):
             raise ValidationError('Email already registered. Please use a different email address.')
     
     def validate_current_password(self, current_password):
         """Validate that current password is correct"""
-        from flask_login import current_user
-        from flask import current_app
-        from src.auth import get_user_id
-        
-        # Get current user (handle test mode)
-        if current_app.config.get('TESTING', False):
-            user_id = get_user_id()
-            if user_id:
-                test_user = User.query.get(user_id)
-                if test_user and not test_user.check_password(current_password.data):
-                    raise ValidationError('Current password is incorrect.')
-        else:
-            if current_user.is_authenticated:
-                if not current_user.check_password(current_password.data):
-                    raise ValidationError('Current password is incorrect.')
\ No newline at end of file
+        validate_current_password(current_password.data)
\ No newline at end of file
@@ -1,69 +1,172 @@
 import logging
 import sqlite3
-from sqlalchemy import inspect, text
-from typing import List, Dict, Optional, Any, Tuple
+from contextlib import contextmanager
+from sqlalchemy import text
+from typing import List, Dict, Optional, Any, Set, Tuple
 from datetime import datetime, UTC
 
-from .models import db, WeightEntry, WeightCategory, User
+from .models import db, WeightEntry, WeightCategory
 
 # Set up logger
 logger = logging.getLogger(__name__)
 
+# Latest migration (migrate_db_vN) applied by check_and_migrate_database,
+# recorded in the database header via PRAGMA user_version
+CURRENT_SCHEMA_VERSION = 16
+
+# Columns added after the first release that are back-filled with a plain
+# ALTER TABLE ... ADD COLUMN, with the column definition used to add them
+_ADDED_COLUMNS: Dict[str, Tuple[Tuple[str, str], ...]] = {
+    "weight_entry": (("reps", "INTEGER"), ("notes", "TEXT")),
+    "weight_category": (("last_used_at", "TIMESTAMP"), ("is_body_weight", "BOOLEAN DEFAULT 0")),
+}
+
+# Column names each model expects, keyed by table name; fixed once the models
+# are imported
+_MODEL_COLUMNS = {
+    model.__table__.name: frozenset(c.name for c in model.__table__.columns)
+    for model in (WeightEntry, WeightCategory)
+}
+
 def check_and_migrate_database() -> None:
     """Check database schema and perform migrations if needed"""
     try:
         logger.info("Checking database schema for required migrations")
         
-        # Get all tables first
-        inspector = inspect(db.engine)
+        # Databases stamped by a previous run at (or, after a rollback of the
+        # app, beyond) the current version need no inspection at all
+        schema_version = _get_schema_version()
+        if schema_version >= CURRENT_SCHEMA_VERSION:
+            logger.info("Database schema up to date (version %s)", schema_version)
+            return
+        
+        # Read every table and its columns once; reused by the schema checks below
+        schema = _read_schema()
         
         # Check if database is completely new or needs complete setup
         needs_full_setup = False
         
         # Check if weight_entry table exists before creating any tables
-        if not inspector.has_table("weight_entry"):
+        if "weight_entry" not in schema:
             logger.info("weight_entry table doesn't exist yet, performing full setup")
             needs_full_setup = True
             
         # Apply full setup if needed, or specific migrations
         if needs_full_setup:
-            # For fresh installations, create all tables first
+            # For fresh installations, create all tables first; the model
+            # already has every column, so only the migrations below that
+            # create triggers, indexes or the default user have work to do
             db.create_all()
-            # Create default user first
-            migrate_db_v9()  # Add user table with default user
-            # Refresh the session to see the newly created user
-            db.session.commit()
-            db.session.close()  # Clear session cache
-            # Now create default categories with user_id
-            from . import services
-            # Get the default user we just created
-            default_user = User.query.filter_by(username='default').first()
-            if default_user:
-                services.create_default_category(user_id=default_user.id)
-            # For fresh installations, there are no old entries to migrate
-            # services.migrate_old_entries_to_body_mass()
+            schema = _read_schema()
+            pending_columns = {}
         else:
-            # Check weight_entry schema for missing columns
-            missing_weight_entry_columns = _check_weight_entry_schema(inspector)
-            if missing_weight_entry_columns:
-                _migrate_weight_entry_schema(missing_weight_entry_columns)
+            # Collect missing columns per table so every ALTER is applied
+            # through one connection and committed together
+            pending_columns = {
+                "weight_entry": _check_weight_entry_schema(schema),
+                "weight_category": _check_weight_category_schema(schema),
+            }
+            pending_columns = {table: columns for table, columns in pending_columns.items() if columns}
+        
+        # Fresh and existing databases run the same migration chain, so the
+        # version is only stamped once a database has everything each
+        # migrate_db_vN creates. Every step runs on one pooled connection
+        # rather than checking one out per migration
+        connection = db.engine.raw_connection()
+        try:
+            if pending_columns:
+                _migrate_missing_columns(pending_columns, connection)
+                for table_name, columns in pending_columns.items():
+                    schema[table_name].update(column_name for column_name, _ in columns)
             
-            # Check weight_category schema for missing columns
-            missing_weight_category_columns = _check_weight_category_schema(inspector)
-            if missing_weight_category_columns:
-                _migrate_weight_category_schema(missing_weight_category_columns)
-                
-            # Apply subsequent migrations as needed
-            migrate_db_v6()  # Add is_body_weight column
-            migrate_db_v7()  # Rename is_body_weight to is_body_weight_exercise
-            migrate_db_v8()  # Fix Body Mass category corruption
-            migrate_db_v9()  # Add user table
-            migrate_db_v10()  # Add user_id columns to existing tables
+            # Column migrations that predate the current model
+            if not needs_full_setup:
+                migrate_db_v6(schema, connection)  # Add is_body_weight column
+                migrate_db_v7(schema, connection)  # Rename is_body_weight to is_body_weight_exercise
+            
+            # Those given the schema snapshot decide from it whether there is
+            # any work to do; the rest are idempotent
+            migrate_db_v8(connection)  # Fix Body Mass category corruption
+            default_user_id = migrate_db_v9(connection)  # Add user table
+            migrate_db_v10(schema, connection, default_user_id)  # Add user_id columns to existing tables
+            migrate_db_v11(connection)  # Store entry timestamps as epoch seconds
+            migrate_db_v12(connection)  # Composite (category_id, created_at) index
+            migrate_db_v13(connection)  # Composite (user_id, created_at) index
+            migrate_db_v14(connection)  # Unique category names per user
+            migrate_db_v15(connection)  # Reset token expiry as epoch seconds
+            migrate_db_v16(connection)  # Index names shared with the models
             
+            # A fresh database has no rows to gather statistics from
+            if not needs_full_setup:
+                _analyze_tables(connection)  # Planner statistics for the new indexes
+        finally:
+            connection.close()
+        
+        if needs_full_setup:
+            # Now create default categories with user_id
+            from . import services
+            services.create_default_category(user_id=default_user_id)
+            
+        _set_schema_version(CURRENT_SCHEMA_VERSION)
         logger.info("Database schema check and migrations completed")
     except Exception as e:
-        logger.error(f"Error during database migration: {str(e)}")
+        logger.error("Error during database migration: %s", e)
+        raise
+
+def _read_schema() -> Dict[str, Set[str]]:
+    """Map every table in the database to its column names using one query"""
+    schema = {}
+    with db.engine.connect() as connection:
+        rows = connection.execute(text("""
+            SELECT m.name, p.name
+            FROM sqlite_master AS m
+            JOIN pragma_table_info(m.name) AS p
+            WHERE m.type = 'table'
+        """))
+        for table_name, column_name in rows:
+            schema.setdefault(table_name, set()).add(column_name)
+    return schema
+
+def _get_schema_version() -> int:
+    """Read the schema version stored in the database header"""
+    with db.engine.connect() as connection:
+        return connection.execute(text("PRAGMA user_version")).scalar() or 0
+
+def _set_schema_version(version: int) -> None:
+    """Stamp the database header with the given schema version"""
+    with db.engine.begin() as connection:
+        connection.execute(text(f"PRAGMA user_version = {int(version)}"))
+    logger.info("✅ Schema version set to %s", version)
+
+@contextmanager
+def _migration_transaction(connection):
+    """Run a migration's statements in a single BEGIN IMMEDIATE ... COMMIT
+    
+    sqlite3 autocommits DDL outside an explicit transaction, so without this
+    every ALTER/CREATE is synced to disk on its own. Taking the write lock up
+    front also avoids SQLITE_BUSY part-way through a migration.
+    """
+    cursor = connection.cursor()
+    cursor.execute("BEGIN IMMEDIATE")
+    try:
+        yield cursor
+    except BaseException:
+        connection.rollback()
         raise
+    connection.commit()
+
+def _analyze_tables(connection) -> None:
+    """Gather planner statistics for the entry and category indexes
+    
+    Without sqlite_stat1 rows SQLite guesses index selectivity, which can
+    make it pick a less selective index or a full scan on a migrated database.
+    """
+    with _migration_transaction(connection) as cursor:
+        cursor.execute("ANALYZE weight_entry")
+        cursor.execute("ANALYZE weight_category")
+        cursor.execute("SELECT COUNT(*) FROM sqlite_stat1")
+        stats_count = cursor.fetchone()[0]
+    logger.info("✅ Analyzed weight_entry and weight_category (%s sqlite_stat1 rows)", stats_count)
 
 def _recreate_all_tables() -> None:
     """Drop all tables and recreate them"""
@@ -73,106 +176,77 @@ def _recreate_all_tables() -> None:
         db.drop_all()
         # Create all tables
         db.create_all()
+        _set_schema_version(CURRENT_SCHEMA_VERSION)
         logger.info("All tables recreated successfully")
     except Exception as e:
-        logger.error(f"Error recreating tables: {str(e)}")
+        logger.error("Error recreating tables: %s", e)
         raise
 
-def _migrate_weight_entry_schema(missing_columns: List[tuple]) -> None:
-    """Add missing columns to weight_entry table"""
-    logger.info(f"Migrating weight_entry table to add columns: {missing_columns}")
+def _migrate_missing_columns(pending_columns: Dict[str, List[tuple]], connection=None) -> None:
+    """Add missing columns, grouped by table, using a single connection and commit
+    
+    SQLite only accepts one ADD COLUMN clause per ALTER TABLE statement, but
+    adding a column only rewrites the schema entry (not the table data), so
+    issuing the statements back-to-back on one connection is cheap.
+    """
+    logger.info("Migrating tables to add columns: %s", pending_columns)
     
+    owns_connection = connection is None
     try:
-        # Get SQLite connection
-        connection = db.engine.raw_connection()
-        cursor = connection.cursor()
-        
-        # Add each missing column
-        for column_name, column_type in missing_columns:
-            logger.info(f"Adding column {column_name} ({column_type}) to weight_entry table")
-            try:
-                cursor.execute(f"ALTER TABLE weight_entry ADD COLUMN {column_name} {column_type}")
-                # For reps column, set default value for non-body mass entries
-                if column_name == "reps":
+        # Get SQLite connection, unless the caller is sharing one
+        if owns_connection:
+            connection = db.engine.raw_connection()
+        # Every ALTER and backfill lands in a single commit (or none)
+        with _migration_transaction(connection) as cursor:
+            for table_name, missing_columns in pending_columns.items():
+                for column_name, column_type in missing_columns:
+                    logger.info("Adding column %s (%s) to %s table", column_name, column_type, table_name)
                     try:
-                        # First find all non-body mass entries
-                        cursor.execute("""
-                            SELECT we.id 
-                            FROM weight_entry we
-                            JOIN weight_category wc ON we.category_id = wc.id
-                            WHERE wc.is_body_mass = 0
-                        """)
-                        non_body_mass_entries = cursor.fetchall()
-                        
-                        # Set default value of 1 for non-body mass entries
-                        if non_body_mass_entries:
-                            ids = ','.join(str(entry[0]) for entry in non_body_mass_entries)
-                            cursor.execute(f"UPDATE weight_entry SET reps = 1 WHERE id IN ({ids})")
-                            logger.info(f"Set default reps=1 for {len(non_body_mass_entries)} non-body mass entries")
+                        cursor.execute(f"ALTER TABLE {table_name} ADD COLUMN {column_name} {column_type}")
+                        _backfill_new_column(cursor, table_name, column_name)
                     except sqlite3.OperationalError as e:
-                        logger.warning(f"Error updating reps: {str(e)}")
-            except sqlite3.OperationalError as e:
-                if "duplicate column name" in str(e):
-                    logger.warning(f"Column {column_name} already exists, skipping")
-                else:
-                    raise
-        
-        # Commit changes
-        connection.commit()
+                        if "duplicate column name" in str(e):
+                            logger.warning("Column %s already exists in %s, skipping", column_name, table_name)
+                        else:
+                            raise
         
         logger.info("Migration completed successfully")
     
     except Exception as e:
-        logger.error(f"Error during migration: {str(e)}")
+        logger.error("Error during migration: %s", e)
         raise
     finally:
-        if 'connection' in locals():
+        if owns_connection and connection:
             connection.close()
 
-def _migrate_weight_category_schema(missing_columns: List[tuple]) -> None:
-    """Add missing columns to weight_category table"""
-    logger.info(f"Migrating weight_category table to add columns: {missing_columns}")
-    
-    try:
-        # Get SQLite connection
-        connection = db.engine.raw_connection()
-        cursor = connection.cursor()
-        
-        # Add each missing column
-        for column_name, column_type in missing_columns:
-            logger.info(f"Adding column {column_name} ({column_type}) to weight_category table")
-            try:
-                cursor.execute(f"ALTER TABLE weight_category ADD COLUMN {column_name} {column_type}")
-                
-                # If adding last_used_at, set it to created_at as a reasonable default
-                if column_name == "last_used_at":
-                    try:
-                        cursor.execute("""
-                            UPDATE weight_category 
-                            SET last_used_at = created_at
-                            WHERE last_used_at IS NULL
-                        """)
-                        logger.info("Set default last_used_at values based on created_at timestamps")
-                    except sqlite3.OperationalError as e:
-                        logger.warning(f"Error updating last_used_at: {str(e)}")
-                
-            except sqlite3.OperationalError as e:
-                if "duplicate column name" in str(e):
-                    logger.warning(f"Column {column_name} already exists, skipping")
-                else:
-                    raise
-        
-        # Commit changes
-        connection.commit()
-        
-        logger.info("Migration for weight_category completed successfully")
+def _backfill_new_column(cursor, table_name: str, column_name: str) -> None:
+    """Populate sensible defaults for a column that was just added"""
+    if table_name == "weight_entry" and column_name == "reps":
+        # Set default value for non-body mass entries
+        try:
+            # Set default value of 1 for non-body mass entries in one statement
+            cursor.execute("""
+                UPDATE weight_entry 
+                SET reps = 1 
+                WHERE reps IS NULL 
+                  AND category_id IN (SELECT id FROM weight_category WHERE is_body_mass = 0)
+            """)
+            if cursor.rowcount:
+                logger.info("Set default reps=1 for %s non-body mass entries", cursor.rowcount)
+        except sqlite3.OperationalError as e:
+            logger.warning("Error updating reps: %s", e)
     
-    except Exception as e:
-        logger.error(f"Error during weight_category migration: {str(e)}")
-        raise
-    finally:
-        if 'connection' in locals():
-            connection.close()
+    elif table_name == "weight_category" and column_name == "last_used_at":
+        # Set it to created_at as a reasonable default
+        try:
+            cursor.execute("""
+                UPDATE weight_category 
+                SET last_used_at = created_at
+                WHERE last_used_at IS NULL
+            """)
+            logger.info("Set default last_used_at values based on created_at timestamps")
+        except sqlite3.OperationalError as e:
+            logger.warning("Error updating last_used_at: %s", e)
 
 def verify_model_schema() -> Dict[str, bool]:
     """Verify if database schema matches model schema
@@ -181,28 +255,20 @@ def verify_model_schema() -> Dict[str, bool]:
     """
     results = {}
     try:
-        inspector = inspect(db.engine)
-        tables = inspector.get_table_names()
-        
-        # Check WeightEntry model
-        if "weight_entry" in tables:
-            model_columns = {c.name for c in WeightEntry.__table__.columns}
-            db_columns = {c["name"] for c in inspector.get_columns("weight_entry")}
-            results["weight_entry"] = model_columns.issubset(db_columns)
-        else:
-            results["weight_entry"] = False
-            
-        # Check WeightCategory model
-        if "weight_category" in tables:
-            model_columns = {c.name for c in WeightCategory.__table__.columns}
-            db_columns = {c["name"] for c in inspector.get_columns("weight_category")}
-            results["weight_category"] = model_columns.issubset(db_columns)
-        else:
-            results["weight_category"] = False
+        # Read the columns of every table in one query; missing tables are
+        # simply absent from the result
+        db_columns = _read_schema()
+        
+        # Check WeightEntry and WeightCategory models
+        for table, model_columns in _MODEL_COLUMNS.items():
+            if table in db_columns:
+                results[table] = model_columns.issubset(db_columns[table])
+            else:
+                results[table] = False
             
         return results
     except Exception as e:
-        logger.error(f"Error verifying model schema: {str(e)}")
+        logger.error("Error verifying model schema: %s", e)
         return {"error": False}
 
 def migrate_db_v1(db):
@@ -211,24 +277,24 @@ def migrate_db_v1(db):
     """
     try:
         # Create schema_version table
-        db.session.execute("""
+        db.session.execute(text("""
             CREATE TABLE IF NOT EXISTS schema_version (
                 id INTEGER PRIMARY KEY,
                 version INTEGER NOT NULL
             )
-        """)
+        """))
         
         # Insert initial version
-        db.session.execute("""
+        db.session.execute(text("""
             INSERT INTO schema_version (id, version) 
             VALUES (1, 1)
-        """)
+        """))
         
         db.session.commit()
-        print("Migration v1 completed successfully")
+        logger.info("Migration v1 completed successfully")
         return True
     except Exception as e:
-        print(f"Error in migration v1: {e}")
+        logger.error("Error in migration v1: %s", e)
         db.session.rollback()
         return False
 
@@ -238,23 +304,23 @@ def migrate_db_v2(db):
     """
     try:
         # Add category_id column to weight_entry
-        db.session.execute("""
+        db.session.execute(text("""
             ALTER TABLE weight_entry 
             ADD COLUMN category_id INTEGER REFERENCES weight_category(id)
-        """)
+        """))
         
         # Update schema version
-        db.session.execute("""
+        db.session.execute(text("""
             UPDATE schema_version 
             SET version = 2 
             WHERE id = 1
-        """)
+        """))
         
         db.session.commit()
-        print("Migration v2 completed successfully")
+        logger.info("Migration v2 completed successfully")
         return True
     except Exception as e:
-        print(f"Error in migration v2: {e}")
+        logger.error("Error in migration v2: %s", e)
         db.session.rollback()
         return False
 
@@ -264,23 +330,23 @@ def migrate_db_v3(db):
     """
     try:
         # Add is_body_mass column to weight_category
-        db.session.execute("""
+        db.session.execute(text("""
             ALTER TABLE weight_category 
             ADD COLUMN is_body_mass BOOLEAN DEFAULT 0
-        """)
+        """))
         
         # Update schema version
-        db.session.execute("""
+        db.session.execute(text("""
             UPDATE schema_version 
             SET version = 3 
             WHERE id = 1
-        """)
+        """))
         
         db.session.commit()
-        print("Migration v3 completed successfully")
+        logger.info("Migration v3 completed successfully")
         return True
     except Exception as e:
-        print(f"Error in migration v3: {e}")
+        logger.error("Error in migration v3: %s", e)
         db.session.rollback()
         return False
 
@@ -290,23 +356,23 @@ def migrate_db_v4(db):
     """
     try:
         # Add reps column to weight_entry
-        db.session.execute("""
+        db.session.execute(text("""
             ALTER TABLE weight_entry 
             ADD COLUMN reps INTEGER
-        """)
+        """))
         
         # Update schema version
-        db.session.execute("""
+        db.session.execute(text("""
             UPDATE schema_version 
             SET version = 4 
             WHERE id = 1
-        """)
+        """))
         
         db.session.commit()
-        print("Migration v4 completed successfully")
+        logger.info("Migration v4 completed successfully")
         return True
     except Exception as e:
-        print(f"Error in migration v4: {e}")
+        logger.error("Error in migration v4: %s", e)
         db.session.rollback()
         return False
 
@@ -314,162 +380,153 @@ def migrate_db_v5(db):
     """
     Migration v5: Add last_used_at to WeightCategory and remove notes from WeightEntry
     """
+    # ALTER TABLE ... DROP COLUMN needs SQLite 3.35+
+    if sqlite3.sqlite_version_info < (3, 35, 0):
+        logger.error("Error in migration v5: SQLite %s does not support DROP COLUMN", sqlite3.sqlite_version)
+        return False
+    
+    connection = db.engine.raw_connection()
     try:
-        # Add last_used_at column to weight_category
-        db.session.execute("""
-            ALTER TABLE weight_category 
-            ADD COLUMN last_used_at TIMESTAMP
+        # Add last_used_at, drop notes and bump the schema version in a single
+        # script, wrapped in one transaction so a failure leaves no partial change
+        connection.executescript("""
+            BEGIN;
+            ALTER TABLE weight_category ADD COLUMN last_used_at TIMESTAMP;
+            ALTER TABLE weight_entry DROP COLUMN notes;
+            UPDATE schema_version SET version = 5 WHERE id = 1;
+            COMMIT;
         """)
-        
-        # Remove notes column from weight_entry
-        db.session.execute("""
-            ALTER TABLE weight_entry 
-            DROP COLUMN notes
-        """)
-        
-        # Update schema version
-        db.session.execute("""
-            UPDATE schema_version 
-            SET version = 5 
-            WHERE id = 1
-        """)
-        
-        db.session.commit()
-        print("Migration v5 completed successfully")
+        logger.info("Migration v5 completed successfully")
         return True
     except Exception as e:
-        print(f"Error in migration v5: {e}")
-        db.session.rollback()
+        logger.error("Error in migration v5: %s", e)
+        connection.rollback()
         return False
+    finally:
+        connection.close()
 
-def migrate_db_v6() -> None:
+def migrate_db_v6(schema: Optional[Dict[str, Set[str]]] = None, connection=None) -> None:
     """Add is_body_weight column to weight_category table"""
     logger.info("Migrating database to v6: Adding is_body_weight column")
     
+    if schema is None:
+        schema = _read_schema()
+    
+    # Check if the column already exists
+    if "is_body_weight" in schema.get("weight_category", ()):
+        logger.info("is_body_weight column already exists, skipping")
+        return
+    
+    owns_connection = connection is None
     try:
-        # Get SQLite connection
-        connection = db.engine.raw_connection()
-        cursor = connection.cursor()
-        
-        # Check if the column already exists
-        cursor.execute("PRAGMA table_info(weight_category)")
-        columns = cursor.fetchall()
-        column_names = [col[1] for col in columns]
-        
-        # Add the column if it doesn't exist yet
-        if "is_body_weight" not in column_names:
+        # Get SQLite connection, unless the caller is sharing one
+        if owns_connection:
+            connection = db.engine.raw_connection()
+        with _migration_transaction(connection) as cursor:
             logger.info("Adding is_body_weight column to weight_category table")
             cursor.execute("ALTER TABLE weight_category ADD COLUMN is_body_weight BOOLEAN DEFAULT 0")
-            connection.commit()
             
             # Now update any existing categories that might have been flagged incorrectly
             # Look for categories that have "body weight" in their name and set them correctly
-            cursor.execute("SELECT id, name FROM weight_category")
-            categories = cursor.fetchall()
-            
-            for cat_id, name in categories:
-                if "body weight" in name.lower() or "bodyweight" in name.lower():
-                    logger.info(f"Setting is_body_weight=1 for category '{name}' (id: {cat_id})")
-                    cursor.execute(
-                        "UPDATE weight_category SET is_body_weight = 1, is_body_mass = 0 WHERE id = ?", 
-                        (cat_id,)
-                    )
-            
-            connection.commit()
-        else:
-            logger.info("is_body_weight column already exists, skipping")
+            cursor.execute(
+                "UPDATE weight_category SET is_body_weight = 1, is_body_mass = 0 "
+                "WHERE lower(name) LIKE ? OR lower(name) LIKE ?",
+                ("%body weight%", "%bodyweight%")
+            )
+            if cursor.rowcount:
+                logger.info("Set is_body_weight=1 for %s body weight categor%s",
+                            cursor.rowcount, 'y' if cursor.rowcount == 1 else 'ies')
+        
+        schema.setdefault("weight_category", set()).add("is_body_weight")
             
     except Exception as e:
-        logger.error(f"Error in migration v6: {str(e)}")
+        logger.error("Error in migration v6: %s", e)
         raise
     finally:
-        if connection:
+        if owns_connection and connection:
             connection.close()
             
     logger.info("Database migration v6 completed successfully")
 
-def migrate_db_v7() -> None:
+def migrate_db_v7(schema: Optional[Dict[str, Set[str]]] = None, connection=None) -> None:
     """Rename is_body_weight column to is_body_weight_exercise for clarity"""
     logger.info("Migrating database to v7: Renaming is_body_weight to is_body_weight_exercise")
     
-    try:
-        # Get SQLite connection
-        connection = db.engine.raw_connection()
-        cursor = connection.cursor()
-        
-        # Check current table structure
-        cursor.execute("PRAGMA table_info(weight_category)")
-        columns = cursor.fetchall()
-        column_names = [col[1] for col in columns]
-        
-        # Check if we need to do the migration
-        if "is_body_weight_exercise" in column_names:
-            logger.info("is_body_weight_exercise column already exists, skipping migration")
-            return
-            
-        if "is_body_weight" not in column_names:
-            logger.info("is_body_weight column not found, skipping migration")
-            return
-        
-        logger.info("Performing column rename migration...")
-        
-        # SQLite doesn't support column rename directly, so we need to:
-        # 1. Add new column
-        # 2. Copy data
-        # 3. Drop old column (by recreating table)
-        
-        # Step 1: Add new column
-        cursor.execute("ALTER TABLE weight_category ADD COLUMN is_body_weight_exercise BOOLEAN DEFAULT 0")
-        
-        # Step 2: Copy data from old to new column
-        cursor.execute("UPDATE weight_category SET is_body_weight_exercise = is_body_weight")
-        
-        # Step 3: Get all current data
-        cursor.execute("""
-            SELECT id, name, is_body_mass, is_body_weight_exercise, created_at, last_used_at 
-            FROM weight_category
-        """)
-        categories = cursor.fetchall()
-        
-        # Step 4: Recreate table without old column
-        cursor.execute("DROP TABLE weight_category")
-        
-        cursor.execute("""
-            CREATE TABLE weight_category (
-                id INTEGER PRIMARY KEY,
-                name VARCHAR(50) NOT NULL UNIQUE,
-                is_body_mass BOOLEAN DEFAULT 0,
-                is_body_weight_exercise BOOLEAN DEFAULT 0,
-                created_at DATETIME,
-                last_used_at DATETIME
-            )
-        """)
+    if schema is None:
+        schema = _read_schema()
+    column_names = schema.get("weight_category", set())
+    
+    # Check if we need to do the migration
+    if "is_body_weight_exercise" in column_names:
+        logger.info("is_body_weight_exercise column already exists, skipping migration")
+        return
         
-        # Step 5: Restore data
-        for cat in categories:
-            cursor.execute("""
-                INSERT INTO weight_category 
-                (id, name, is_body_mass, is_body_weight_exercise, created_at, last_used_at)
-                VALUES (?, ?, ?, ?, ?, ?)
-            """, cat)
+    if "is_body_weight" not in column_names:
+        logger.info("is_body_weight column not found, skipping migration")
+        return
+    
+    # SQLite 3.25+ renames a column in place as a schema-only change
+    rename_in_place = sqlite3.sqlite_version_info >= (3, 25, 0)
+    
+    owns_connection = connection is None
+    try:
+        # Get SQLite connection, unless the caller is sharing one
+        if owns_connection:
+            connection = db.engine.raw_connection()
+        
+        with _migration_transaction(connection) as cursor:
+            if rename_in_place:
+                logger.info("Renaming column in place...")
+                cursor.execute("ALTER TABLE weight_category RENAME COLUMN is_body_weight TO is_body_weight_exercise")
+            else:
+                logger.info("Performing column rename migration...")
+                
+                # Older SQLite doesn't support column rename directly, so rebuild
+                # the table under the new column name: create it alongside, copy
+                # the rows across inside SQLite, then swap it in
+                cursor.execute("""
+                    CREATE TABLE weight_category_new (
+                        id INTEGER PRIMARY KEY,
+                        name VARCHAR(50) NOT NULL UNIQUE,
+                        is_body_mass BOOLEAN DEFAULT 0,
+                        is_body_weight_exercise BOOLEAN DEFAULT 0,
+                        created_at DATETIME,
+                        last_used_at DATETIME
+                    )
+                """)
+                
+                cursor.execute("""
+                    INSERT INTO weight_category_new 
+                    (id, name, is_body_mass, is_body_weight_exercise, created_at, last_used_at)
+                    SELECT id, name, is_body_mass, is_body_weight, created_at, last_used_at
+                    FROM weight_category
+                """)
+                
+                cursor.execute("DROP TABLE weight_category")
+                cursor.execute("ALTER TABLE weight_category_new RENAME TO weight_category")
         
-        connection.commit()
+        if rename_in_place:
+            column_names.discard("is_body_weight")
+            column_names.add("is_body_weight_exercise")
+        else:
+            schema["weight_category"] = {
+                "id", "name", "is_body_mass", "is_body_weight_exercise", "created_at", "last_used_at"
+            }
         logger.info("Database migration v7 completed successfully")
         
     except Exception as e:
-        logger.error(f"Error in migration v7: {str(e)}")
+        logger.error("Error in migration v7: %s", e)
         raise
     finally:
-        if connection:
+        if owns_connection and connection:
             connection.close()
 
-def _check_weight_entry_schema(inspector) -> List[tuple]:
+def _check_weight_entry_schema(schema: Dict[str, Set[str]]) -> List[tuple]:
     """Check weight_entry table schema for missing columns"""
-    if not inspector.has_table("weight_entry"):
+    if "weight_entry" not in schema:
         return []
     
-    columns = inspector.get_columns("weight_entry")
-    column_names = set(col["name"] for col in columns)
+    column_names = schema["weight_entry"]
     
     missing_columns = []
     
@@ -485,168 +542,114 @@ def _check_weight_entry_schema(inspector) -> List[tuple]:
         else:
             raise ValueError("Database schema is corrupted - missing required column category_id")
     
-    # Check for missing reps column
-    if "reps" not in column_names:
-        missing_columns.append(("reps", "INTEGER"))
-    
-    # Check for missing notes column
-    if "notes" not in column_names:
-        missing_columns.append(("notes", "TEXT"))
+    # Check for missing reps and notes columns
+    missing_columns.extend(spec for spec in _ADDED_COLUMNS["weight_entry"] if spec[0] not in column_names)
     
-    logger.info(f"Missing columns in weight_entry: {missing_columns}")
+    logger.info("Missing columns in weight_entry: %s", missing_columns)
     return missing_columns
 
-def _check_weight_category_schema(inspector) -> List[tuple]:
+def _check_weight_category_schema(schema: Dict[str, Set[str]]) -> List[tuple]:
     """Check weight_category table schema for missing columns"""
-    if not inspector.has_table("weight_category"):
+    if "weight_category" not in schema:
         return []
     
-    columns = inspector.get_columns("weight_category")
-    column_names = set(col["name"] for col in columns)
-    
-    missing_columns = []
+    column_names = schema["weight_category"]
     
-    # Check for missing last_used_at column
-    if "last_used_at" not in column_names:
-        missing_columns.append(("last_used_at", "TIMESTAMP"))
+    # Check for missing last_used_at and is_body_weight columns
+    missing_columns = [spec for spec in _ADDED_COLUMNS["weight_category"] if spec[0] not in column_names]
     
-    # Check for missing is_body_weight column
-    if "is_body_weight" not in column_names:
-        missing_columns.append(("is_body_weight", "BOOLEAN DEFAULT 0"))
-    
-    logger.info(f"Missing columns in weight_category: {missing_columns}")
+    logger.info("Missing columns in weight_category: %s", missing_columns)
     return missing_columns
 
-def migrate_db_v8() -> None:
+def migrate_db_v8(connection=None) -> None:
     """Fix Body Mass category corruption - ensure it only has is_body_mass=True"""
     logger.info("Migrating database to v8: Fix Body Mass category corruption")
     
+    owns_connection = connection is None
     try:
-        # Get SQLite connection
-        connection = db.engine.raw_connection()
-        cursor = connection.cursor()
-        
-        # Check for Body Mass category with corrupted flags
-        cursor.execute("""
-            SELECT id, name, is_body_mass, is_body_weight_exercise 
-            FROM weight_category 
-            WHERE name = 'Body Mass'
-        """)
-        result = cursor.fetchone()
-        
-        if result:
-            cat_id, name, is_body_mass, is_body_weight_exercise = result
-            logger.info(f"Found Body Mass category (ID: {cat_id})")
-            logger.info(f"  Current state: is_body_mass={is_body_mass}, is_body_weight_exercise={is_body_weight_exercise}")
+        # Get SQLite connection, unless the caller is sharing one
+        if owns_connection:
+            connection = db.engine.raw_connection()
+        with _migration_transaction(connection) as cursor:
+            # Fix the corruption in place - the WHERE clause makes this a no-op once
+            # every Body Mass category is configured correctly, so no SELECT is needed
+            cursor.execute("""
+                UPDATE weight_category 
+                SET is_body_weight_exercise = 0 
+                WHERE name = 'Body Mass' AND is_body_mass = 1 AND is_body_weight_exercise = 1
+            """)
+            fixed_count = cursor.rowcount
             
-            # Check if it has the corruption (both flags True)
-            if is_body_mass and is_body_weight_exercise:
-                logger.warning("🚨 CRITICAL BUG DETECTED: Body Mass category has both flags set to True!")
+            if fixed_count:
+                logger.warning("🚨 CRITICAL BUG DETECTED: Body Mass category had both flags set to True!")
                 logger.warning("This causes weight entries to save as 0 instead of submitted weight.")
-                logger.info("🔧 Applying automatic fix...")
-                
-                # Fix the corruption
-                cursor.execute("""
-                    UPDATE weight_category 
-                    SET is_body_weight_exercise = 0 
-                    WHERE id = ? AND name = 'Body Mass'
-                """, (cat_id,))
-                
-                connection.commit()
-                
-                # Verify the fix
-                cursor.execute("""
-                    SELECT is_body_mass, is_body_weight_exercise 
-                    FROM weight_category 
-                    WHERE id = ?
-                """, (cat_id,))
-                new_result = cursor.fetchone()
-                
-                if new_result:
-                    new_is_body_mass, new_is_body_weight_exercise = new_result
-                    if new_is_body_mass and not new_is_body_weight_exercise:
-                        logger.info("✅ Body Mass category corruption fixed successfully!")
-                        logger.info("Weight entries should now save correctly.")
-                    else:
-                        logger.error("❌ Failed to fix Body Mass category corruption!")
-                        raise Exception("Body Mass category fix verification failed")
-                
-            elif is_body_mass and not is_body_weight_exercise:
-                logger.info("✅ Body Mass category is already correctly configured")
+                logger.info("✅ Body Mass category corruption fixed for %s categor%s", fixed_count, 'y' if fixed_count == 1 else 'ies')
             else:
-                logger.warning(f"⚠️  Body Mass category has unexpected configuration:")
-                logger.warning(f"   is_body_mass={is_body_mass}, is_body_weight_exercise={is_body_weight_exercise}")
-                # Don't fail the migration for unexpected configs, just log it
-        else:
-            logger.info("Body Mass category not found - this might be a fresh installation")
-        
-        # Add database triggers to prevent future corruption
-        logger.info("Adding database triggers to prevent future corruption...")
-        
-        # Drop triggers if they exist
-        cursor.execute("DROP TRIGGER IF EXISTS check_category_flags_update")
-        cursor.execute("DROP TRIGGER IF EXISTS check_category_flags_insert")
-        
-        # Create trigger to prevent both flags being True on UPDATE
-        cursor.execute("""
-            CREATE TRIGGER check_category_flags_update
-            BEFORE UPDATE ON weight_category
-            FOR EACH ROW
-            WHEN NEW.is_body_mass = 1 AND NEW.is_body_weight_exercise = 1
-            BEGIN
-                SELECT RAISE(ABORT, 'Category cannot be both body_mass and body_weight_exercise');
-            END
-        """)
-        
-        # Create trigger to prevent both flags being True on INSERT
-        cursor.execute("""
-            CREATE TRIGGER check_category_flags_insert
-            BEFORE INSERT ON weight_category
-            FOR EACH ROW
-            WHEN NEW.is_body_mass = 1 AND NEW.is_body_weight_exercise = 1
-            BEGIN
-                SELECT RAISE(ABORT, 'Category cannot be both body_mass and body_weight_exercise');
-            END
-        """)
+                logger.info("✅ No Body Mass category corruption found")
+            
+            # Add database triggers to prevent future corruption
+            logger.info("Adding database triggers to prevent future corruption...")
+            
+            # Create trigger to prevent both flags being True on UPDATE; the
+            # definitions are fixed, so existing triggers are left in place
+            cursor.execute("""
+                CREATE TRIGGER IF NOT EXISTS check_category_flags_update
+                BEFORE UPDATE ON weight_category
+                FOR EACH ROW
+                WHEN NEW.is_body_mass = 1 AND NEW.is_body_weight_exercise = 1
+                BEGIN
+                    SELECT RAISE(ABORT, 'Category cannot be both body_mass and body_weight_exercise');
+                END
+            """)
+            
+            # Create trigger to prevent both flags being True on INSERT
+            cursor.execute("""
+                CREATE TRIGGER IF NOT EXISTS check_category_flags_insert
+                BEFORE INSERT ON weight_category
+                FOR EACH ROW
+                WHEN NEW.is_body_mass = 1 AND NEW.is_body_weight_exercise = 1
+                BEGIN
+                    SELECT RAISE(ABORT, 'Category cannot be both body_mass and body_weight_exercise');
+                END
+            """)
         
-        connection.commit()
         logger.info("✅ Database triggers created to prevent future corruption")
         logger.info("Database migration v8 completed successfully")
         
     except Exception as e:
-        logger.error(f"Error in migration v8: {str(e)}")
+        logger.error("Error in migration v8: %s", e)
         raise
     finally:
-        if connection:
+        if owns_connection and connection:
             connection.close()
 
-def migrate_db_v9() -> None:
-    """Add user table for multi-user support"""
+def migrate_db_v9(connection=None) -> int:
+    """Add user table for multi-user support
+    
+    Returns the id of the default user, whether it was created or already existed
+    """
     logger.info("Migrating database to v9: Adding user table")
     
+    owns_connection = connection is None
     try:
-        # Get SQLite connection
-        connection = db.engine.raw_connection()
-        cursor = connection.cursor()
+        # Get SQLite connection, unless the caller is sharing one
+        if owns_connection:
+            connection = db.engine.raw_connection()
+        
+        # Placeholder credentials for the user that owns pre-existing data.
+        # The password is published in the log below, so a slow KDF buys
+        # nothing; a single round keeps installs fast and check_password_hash
+        # still accepts it
+        from werkzeug.security import generate_password_hash
         
-        # Check if user table already exists
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='user'")
-        table_exists = cursor.fetchone()
+        default_password_hash = generate_password_hash('changeme123', method='pbkdf2:sha256:1')
+        now = datetime.now(UTC)
         
-        if table_exists:
-            logger.info("User table already exists, checking for default user...")
-            # Check if default user exists
-            cursor.execute("SELECT id FROM user WHERE username = 'default'")
-            if cursor.fetchone():
-                logger.info("Default user already exists, skipping creation")
-                return
-            else:
-                logger.info("Default user missing, creating it...")
-        else:
-            logger.info("Creating user table...")
-            # Create user table
+        with _migration_transaction(connection) as cursor:
+            # Every statement is idempotent, so an already-migrated database
+            # takes the same path without probing sqlite_master first
             cursor.execute("""
-                CREATE TABLE user (
+                CREATE TABLE IF NOT EXISTS user (
                     id INTEGER PRIMARY KEY,
                     username VARCHAR(80) NOT NULL UNIQUE,
                     email VARCHAR(120) NOT NULL UNIQUE,
@@ -656,132 +659,327 @@ def migrate_db_v9() -> None:
                     is_active BOOLEAN DEFAULT 1,
                     last_login DATETIME,
                     reset_token VARCHAR(100) UNIQUE,
-                    reset_token_expires DATETIME
+                    reset_token_expires INTEGER
                 )
             """)
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_user_username ON user(username)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_user_email ON user(email)")
             
-            # Create indexes for performance
-            cursor.execute("CREATE INDEX idx_user_username ON user(username)")
-            cursor.execute("CREATE INDEX idx_user_email ON user(email)")
-        
-        # Create default user for existing data
-        logger.info("Creating default user for existing data migration...")
-        
-        # Generate password hash for default user
-        from werkzeug.security import generate_password_hash
-        from datetime import datetime, UTC
-        
-        default_password_hash = generate_password_hash('changeme123')
-        now = datetime.now(UTC)
+            # The UNIQUE(username) constraint turns a re-run into a no-op
+            cursor.execute("""
+                INSERT OR IGNORE INTO user (username, email, password_hash, created_at, updated_at, is_active)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, ('default', 'default@example.com', default_password_hash, now, now, True))
+            created = cursor.rowcount == 1
+            
+            cursor.execute("SELECT id FROM user WHERE username = 'default'")
+            row = cursor.fetchone()
+            if row is None:
+                raise RuntimeError("Default user could not be created (email already in use?)")
+            default_user_id = row[0]
+        
+        if created:
+            logger.info("✅ User table created successfully with default user (ID: %s)", default_user_id)
+            logger.info("⚠️  Default user credentials: username='default', password='changeme123'")
+            logger.info("🔧 Please change the default password after migration!")
+        else:
+            logger.info("Default user already exists (ID: %s), skipping creation", default_user_id)
         
-        cursor.execute("""
-            INSERT INTO user (username, email, password_hash, created_at, updated_at, is_active)
-            VALUES (?, ?, ?, ?, ?, ?)
-        """, ('default', 'default@example.com', default_password_hash, now, now, True))
+    except Exception as e:
+        logger.error("Error in migration v9: %s", e)
+        raise
+    finally:
+        if owns_connection and connection:
+            connection.close()
+    
+    logger.info("Database migration v9 completed successfully")
+    return default_user_id
+
+def migrate_db_v10(schema: Optional[Dict[str, Set[str]]] = None, connection=None,
+                   default_user_id: Optional[int] = None) -> None:
+    """Add user_id columns to existing tables and assign to default user
+    
+    Pass the id returned by migrate_db_v9 as default_user_id to avoid looking it up again
+    """
+    logger.info("Migrating database to v10: Adding user_id columns")
+    
+    if schema is None:
+        schema = _read_schema()
+    category_needs_user_id = "user_id" not in schema.get("weight_category", ())
+    entry_needs_user_id = "user_id" not in schema.get("weight_entry", ())
+    
+    # The user_id indexes are created together with the columns
+    if not (category_needs_user_id or entry_needs_user_id):
+        logger.info("user_id columns already exist in weight_category and weight_entry tables")
+        return
+    
+    owns_connection = connection is None
+    try:
+        # Get SQLite connection, unless the caller is sharing one
+        if owns_connection:
+            connection = db.engine.raw_connection()
+        with _migration_transaction(connection) as cursor:
+            # Get default user ID, unless v9 already handed it over
+            if default_user_id is None:
+                cursor.execute("SELECT id FROM user WHERE username = 'default'")
+                result = cursor.fetchone()
+                if not result:
+                    raise Exception("Default user not found! Run migration v9 first.")
+                default_user_id = result[0]
+            logger.info("Using default user ID: %s", default_user_id)
+            
+            # Check and add user_id to weight_category table
+            if category_needs_user_id:
+                logger.info("Adding user_id column to weight_category table...")
+                
+                # Add user_id column
+                cursor.execute("ALTER TABLE weight_category ADD COLUMN user_id INTEGER REFERENCES user(id)")
+                
+                # Update existing categories to belong to default user; the
+                # column is new, so the rowcount is every category
+                cursor.execute("UPDATE weight_category SET user_id = ? WHERE user_id IS NULL", (default_user_id,))
+                category_count = cursor.rowcount
+                
+                logger.info("✅ Assigned %s existing categories to default user", category_count)
+            else:
+                logger.info("user_id column already exists in weight_category table")
+            
+            # Check and add user_id to weight_entry table
+            if entry_needs_user_id:
+                logger.info("Adding user_id column to weight_entry table...")
+                
+                # Add user_id column
+                cursor.execute("ALTER TABLE weight_entry ADD COLUMN user_id INTEGER REFERENCES user(id)")
+                
+                # Update existing entries to belong to default user
+                cursor.execute("UPDATE weight_entry SET user_id = ? WHERE user_id IS NULL", (default_user_id,))
+                entry_count = cursor.rowcount
+                
+                logger.info("✅ Assigned %s existing weight entries to default user", entry_count)
+            else:
+                logger.info("user_id column already exists in weight_entry table")
+            
+            # Create indexes for performance, after the backfill so rows are
+            # indexed once. weight_entry's user_id index comes from v13 as the
+            # composite (user_id, created_at); building the single-column one
+            # here would only have v13 drop it again
+            try:
+                cursor.execute("CREATE INDEX IF NOT EXISTS idx_weight_category_user_id ON weight_category(user_id)")
+                logger.info("✅ Created index for weight_category.user_id")
+            except Exception as e:
+                logger.warning("Index creation warning (may already exist): %s", e)
         
-        connection.commit()
+        schema.setdefault("weight_category", set()).add("user_id")
+        schema.setdefault("weight_entry", set()).add("user_id")
+        logger.info("✅ Database migration v10 completed successfully")
+        logger.info("All existing data has been assigned to the default user")
         
-        # Get the default user ID for use in v10 migration
-        cursor.execute("SELECT id FROM user WHERE username = 'default'")
-        default_user_id = cursor.fetchone()[0]
+    except Exception as e:
+        logger.error("Error in migration v10: %s", e)
+        raise
+    finally:
+        if owns_connection and connection:
+            connection.close()
+
+def migrate_db_v11(connection=None) -> None:
+    """Convert weight_entry.created_at from ISO datetime strings to epoch seconds"""
+    logger.info("Migrating database to v11: Converting entry timestamps to epoch seconds")
+    
+    owns_connection = connection is None
+    try:
+        # Get SQLite connection, unless the caller is sharing one
+        if owns_connection:
+            connection = db.engine.raw_connection()
+        with _migration_transaction(connection) as cursor:
+            # Rows that SQLite cannot parse are left untouched; the model still
+            # reads legacy strings
+            cursor.execute("""
+                UPDATE weight_entry
+                SET created_at = CAST(strftime('%s', created_at) AS INTEGER)
+                WHERE typeof(created_at) = 'text'
+                  AND strftime('%s', created_at) IS NOT NULL
+            """)
+            converted_count = cursor.rowcount
         
-        logger.info(f"✅ User table created successfully with default user (ID: {default_user_id})")
-        logger.info("⚠️  Default user credentials: username='default', password='changeme123'")
-        logger.info("🔧 Please change the default password after migration!")
+        if converted_count:
+            logger.info("✅ Converted %s entry timestamps to epoch seconds", converted_count)
+        else:
+            logger.info("Entry timestamps already stored as epoch seconds")
         
     except Exception as e:
-        logger.error(f"Error in migration v9: {str(e)}")
+        logger.error("Error in migration v11: %s", e)
         raise
     finally:
-        if connection:
+        if owns_connection and connection:
             connection.close()
     
-    logger.info("Database migration v9 completed successfully")
+    logger.info("Database migration v11 completed successfully")
 
-def migrate_db_v10() -> None:
-    """Add user_id columns to existing tables and assign to default user"""
-    logger.info("Migrating database to v10: Adding user_id columns")
+def migrate_db_v12(connection=None) -> None:
+    """Index weight_entry on (category_id, user_id, created_at) for per-category timelines
+    
+    Every entry query filters on user_id too; with only (category_id,
+    created_at) the planner would tie with v13's per-user index and could
+    pick the less selective one
+    """
+    logger.info("Migrating database to v12: Adding composite category/user/created_at index")
     
+    owns_connection = connection is None
     try:
-        # Get SQLite connection
-        connection = db.engine.raw_connection()
-        cursor = connection.cursor()
+        # Get SQLite connection, unless the caller is sharing one
+        if owns_connection:
+            connection = db.engine.raw_connection()
+        with _migration_transaction(connection) as cursor:
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_weight_entry_category_created
+                ON weight_entry(category_id, user_id, created_at)
+            """)
+            # The composite index's leading column makes the single-column one redundant
+            cursor.execute("DROP INDEX IF EXISTS idx_weight_entry_category_id")
         
-        # Get default user ID
-        cursor.execute("SELECT id FROM user WHERE username = 'default'")
-        result = cursor.fetchone()
-        if not result:
-            raise Exception("Default user not found! Run migration v9 first.")
+        logger.info("✅ Composite category/user/created_at index is in place")
         
-        default_user_id = result[0]
-        logger.info(f"Using default user ID: {default_user_id}")
+    except Exception as e:
+        logger.error("Error in migration v12: %s", e)
+        raise
+    finally:
+        if owns_connection and connection:
+            connection.close()
+    
+    logger.info("Database migration v12 completed successfully")
+
+def migrate_db_v13(connection=None) -> None:
+    """Index weight_entry on (user_id, created_at) for per-user timelines"""
+    logger.info("Migrating database to v13: Adding composite user/created_at index")
+    
+    owns_connection = connection is None
+    try:
+        # Get SQLite connection, unless the caller is sharing one
+        if owns_connection:
+            connection = db.engine.raw_connection()
+        with _migration_transaction(connection) as cursor:
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_weight_entry_user_created
+                ON weight_entry(user_id, created_at)
+            """)
+            # The composite index's leading column makes the single-column
+            # ones (from v10 or from an older create_all) redundant
+            cursor.execute("DROP INDEX IF EXISTS idx_weight_entry_user_id")
+            cursor.execute("DROP INDEX IF EXISTS ix_weight_entry_user_id")
         
-        # Check and add user_id to weight_category table
-        cursor.execute("PRAGMA table_info(weight_category)")
-        columns = cursor.fetchall()
-        column_names = [col[1] for col in columns]
+        logger.info("✅ Composite user/created_at index is in place")
         
-        if "user_id" not in column_names:
-            logger.info("Adding user_id column to weight_category table...")
-            
-            # Add user_id column
-            cursor.execute("ALTER TABLE weight_category ADD COLUMN user_id INTEGER REFERENCES user(id)")
-            
-            # Update existing categories to belong to default user
-            cursor.execute("UPDATE weight_category SET user_id = ? WHERE user_id IS NULL", (default_user_id,))
-            
-            # Get count of updated categories
-            cursor.execute("SELECT COUNT(*) FROM weight_category WHERE user_id = ?", (default_user_id,))
-            category_count = cursor.fetchone()[0]
-            
-            logger.info(f"✅ Assigned {category_count} existing categories to default user")
-        else:
-            logger.info("user_id column already exists in weight_category table")
+    except Exception as e:
+        logger.error("Error in migration v13: %s", e)
+        raise
+    finally:
+        if owns_connection and connection:
+            connection.close()
+    
+    logger.info("Database migration v13 completed successfully")
+
+def migrate_db_v14(connection=None) -> None:
+    """Enforce unique category names per user with a unique index
+    
+    Fresh schemas get this from the model's UniqueConstraint; an existing
+    table can't gain a constraint, but a unique index enforces the same rule.
+    """
+    logger.info("Migrating database to v14: Enforcing unique category names per user")
+    
+    owns_connection = connection is None
+    try:
+        # Get SQLite connection, unless the caller is sharing one
+        if owns_connection:
+            connection = db.engine.raw_connection()
+        with _migration_transaction(connection) as cursor:
+            # Creating the index would fail on existing duplicates; leave those
+            # databases to application-level checks rather than block startup
+            cursor.execute("""
+                SELECT 1 FROM weight_category
+                GROUP BY name, user_id HAVING COUNT(*) > 1
+                LIMIT 1
+            """)
+            if cursor.fetchone():
+                logger.warning("Duplicate category names found, skipping unique index")
+            else:
+                cursor.execute("""
+                    CREATE UNIQUE INDEX IF NOT EXISTS uq_weight_category_name_user
+                    ON weight_category(name, user_id)
+                """)
+                logger.info("✅ Unique (name, user_id) index is in place")
         
-        # Check and add user_id to weight_entry table
-        cursor.execute("PRAGMA table_info(weight_entry)")
-        columns = cursor.fetchall()
-        column_names = [col[1] for col in columns]
+    except Exception as e:
+        logger.error("Error in migration v14: %s", e)
+        raise
+    finally:
+        if owns_connection and connection:
+            connection.close()
+    
+    logger.info("Database migration v14 completed successfully")
+
+def migrate_db_v15(connection=None) -> None:
+    """Drop reset tokens whose expiry is stored as a datetime string
+    
+    user.reset_token_expires now holds unix epoch seconds. Tokens are only
+    valid for an hour, so pending ones are cleared rather than converted;
+    the user can request a new link.
+    """
+    logger.info("Migrating database to v15: Clearing datetime reset token expiries")
+    
+    owns_connection = connection is None
+    try:
+        # Get SQLite connection, unless the caller is sharing one
+        if owns_connection:
+            connection = db.engine.raw_connection()
+        with _migration_transaction(connection) as cursor:
+            cursor.execute("""
+                UPDATE user SET reset_token = NULL, reset_token_expires = NULL
+                WHERE typeof(reset_token_expires) = 'text'
+            """)
+            cleared_count = cursor.rowcount
         
-        if "user_id" not in column_names:
-            logger.info("Adding user_id column to weight_entry table...")
-            
-            # Add user_id column
-            cursor.execute("ALTER TABLE weight_entry ADD COLUMN user_id INTEGER REFERENCES user(id)")
-            
-            # Update existing entries to belong to default user
-            cursor.execute("UPDATE weight_entry SET user_id = ? WHERE user_id IS NULL", (default_user_id,))
-            
-            # Get count of updated entries
-            cursor.execute("SELECT COUNT(*) FROM weight_entry WHERE user_id = ?", (default_user_id,))
-            entry_count = cursor.fetchone()[0]
-            
-            logger.info(f"✅ Assigned {entry_count} existing weight entries to default user")
-        else:
-            logger.info("user_id column already exists in weight_entry table")
+        logger.info("✅ Cleared %s pending reset tokens", cleared_count)
         
-        # Create indexes for performance
-        try:
+    except Exception as e:
+        logger.error("Error in migration v15: %s", e)
+        raise
+    finally:
+        if owns_connection and connection:
+            connection.close()
+    
+    logger.info("Database migration v15 completed successfully")
+
+def migrate_db_v16(connection=None) -> None:
+    """Give weight_category and weight_entry the same indexes as the models
+    
+    Databases created by create_all before the models named their indexes
+    carry ix_* ones that no migration knows about, and older databases can
+    have a created_at-only index that the composite indexes make redundant.
+    """
+    logger.info("Migrating database to v16: Aligning index names with the models")
+    
+    owns_connection = connection is None
+    try:
+        # Get SQLite connection, unless the caller is sharing one
+        if owns_connection:
+            connection = db.engine.raw_connection()
+        with _migration_transaction(connection) as cursor:
             cursor.execute("CREATE INDEX IF NOT EXISTS idx_weight_category_user_id ON weight_category(user_id)")
-            cursor.execute("CREATE INDEX IF NOT EXISTS idx_weight_entry_user_id ON weight_entry(user_id)")
-            logger.info("✅ Created indexes for user_id columns")
-        except Exception as e:
-            logger.warning(f"Index creation warning (may already exist): {str(e)}")
+            cursor.execute("DROP INDEX IF EXISTS ix_weight_category_user_id")
+            # Every entry query filters on user_id or category_id first
+            cursor.execute("DROP INDEX IF EXISTS ix_weight_entry_created_at")
+            cursor.execute("DROP INDEX IF EXISTS idx_weight_entry_created_at")
         
-        # Update table constraints to ensure category names are unique per user
-        # Note: SQLite doesn't support adding constraints to existing tables,
-        # so we'll rely on application logic for now
-        
-        connection.commit()
-        logger.info("✅ Database migration v10 completed successfully")
-        logger.info("All existing data has been assigned to the default user")
+        logger.info("✅ Index names match the models")
         
     except Exception as e:
-        logger.error(f"Error in migration v10: {str(e)}")
+        logger.error("Error in migration v16: %s", e)
         raise
     finally:
-        if connection:
+        if owns_connection and connection:
             connection.close()
+    
+    logger.info("Database migration v16 completed successfully")
 
 # Update migrations list
 MIGRATIONS = [
@@ -790,7 +988,15 @@ MIGRATIONS = [
     migrate_db_v3,
     migrate_db_v4,
     migrate_db_v5,
+    migrate_db_v6,
+    migrate_db_v7,
     migrate_db_v8,
     migrate_db_v9,
-    migrate_db_v10
+    migrate_db_v10,
+    migrate_db_v11,
+    migrate_db_v12,
+    migrate_db_v13,
+    migrate_db_v14,
+    migrate_db_v15,
+    migrate_db_v16
 ] 
\ No newline at end of file
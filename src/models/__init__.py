@@ -6,19 +6,26 @@ This package contains all database models including User and WeightEntry models.
 
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime, UTC
+from functools import partial
 
 # Initialize SQLAlchemy instance
 db = SQLAlchemy()
 
+# Shared column default/onupdate for "now"; a partial of the C-level
+# datetime.now runs without a Python frame on every insert or update
+_utcnow = partial(datetime.now, UTC)
+
 def format_date(dt: datetime) -> str:
     """Format a datetime object consistently across the app"""
     if isinstance(dt, str):
         # Handle case where dt is already a string (shouldn't happen, but defensive)
         return dt.split(' ')[0] if ' ' in dt else dt
-    return dt.strftime('%Y-%m-%d')
+    # date.isoformat is implemented in C, skips strftime's per-call format
+    # parsing and, unlike datetime.isoformat, never formats the time part
+    return dt.date().isoformat()
 
 # Import models after db is defined to avoid circular imports
 from .user import User
-from .weight import WeightCategory, WeightEntry
+from .weight import WeightCategory, WeightEntry, EpochDateTime, VALID_UNITS
 
-__all__ = ['db', 'format_date', 'User', 'WeightCategory', 'WeightEntry']
\ No newline at end of file
+__all__ = ['db', 'format_date', 'User', 'WeightCategory', 'WeightEntry', 'EpochDateTime', 'VALID_UNITS']
\ No newline at end of file
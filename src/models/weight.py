@@ -1,7 +1,37 @@
 from datetime import datetime, UTC
 from typing import Dict, Any, Optional
+from sqlalchemy.types import TypeDecorator
 
-from . import db, format_date
+from . import db, format_date, _utcnow
+
+# Units accepted for weight entries
+VALID_UNITS = ('kg', 'lb')
+
+
+class EpochDateTime(TypeDecorator):
+    """Datetime stored as INTEGER unix epoch seconds (UTC)
+    
+    Integer timestamps are smaller than ISO strings and make time-window
+    filters integer range scans. Python code still sees naive UTC datetimes,
+    the same as the previous DateTime column returned.
+    """
+    impl = db.Integer
+    cache_ok = True
+    
+    def process_bind_param(self, value, dialect):
+        if isinstance(value, datetime):
+            if value.tzinfo is None:
+                value = value.replace(tzinfo=UTC)
+            return int(value.timestamp())
+        return value
+    
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        if isinstance(value, str):
+            # Legacy ISO string that has not been migrated yet
+            return datetime.fromisoformat(value)
+        return datetime.fromtimestamp(value, UTC).replace(tzinfo=None)
 
 
 class WeightCategory(db.Model):
@@ -9,13 +39,18 @@ class WeightCategory(db.Model):
     name = db.Column(db.String(50), nullable=False)
     is_body_mass = db.Column(db.Boolean, default=False)  # Special case for body mass (just weight, no reps)
     is_body_weight_exercise = db.Column(db.Boolean, default=False)  # For body weight exercises (just reps, no weight)
-    created_at = db.Column(db.DateTime, default=lambda: datetime.now(UTC))
+    created_at = db.Column(db.DateTime, default=_utcnow)
     last_used_at = db.Column(db.DateTime, nullable=True)  # Track when the category was last used
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     entries = db.relationship('WeightEntry', backref='category', lazy=True, cascade="all, delete-orphan")
     
-    # Ensure category names are unique per user, not globally
-    __table_args__ = (db.UniqueConstraint('name', 'user_id', name='_category_name_user_uc'),)
+    # Indexes are declared under the names the migrations give them, so fresh
+    # and migrated databases end up with the same schema
+    __table_args__ = (
+        # Ensure category names are unique per user, not globally
+        db.Index('uq_weight_category_name_user', 'name', 'user_id', unique=True),
+        db.Index('idx_weight_category_user_id', 'user_id'),
+    )
     
     def __repr__(self) -> str:
         return f"WeightCategory(id={self.id}, name={self.name}, is_body_mass={self.is_body_mass}, is_body_weight_exercise={self.is_body_weight_exercise})"
@@ -38,9 +73,21 @@ class WeightEntry(db.Model):
     unit = db.Column(db.String(10), nullable=False)  # 'kg' or 'lb'
     reps = db.Column(db.Integer, nullable=True)  # Number of repetitions (null for body mass)
     category_id = db.Column(db.Integer, db.ForeignKey('weight_category.id'), nullable=False)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
-    created_at = db.Column(db.DateTime, default=lambda: datetime.now(UTC))
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    created_at = db.Column(EpochDateTime, default=_utcnow)
     notes = db.Column(db.Text, nullable=True)  # Optional notes field
+    
+    # Only constraints and indexes the migrations also create belong here;
+    # units are validated against VALID_UNITS by the services instead
+    __table_args__ = (
+        # Per-category timelines: filter on category_id and user_id and read
+        # created_at in order; the implicit trailing rowid also serves the
+        # "id DESC" tiebreak
+        db.Index('idx_weight_entry_category_created', 'category_id', 'user_id', 'created_at'),
+        # Per-user timelines (latest entry, time windows); also covers plain
+        # user_id lookups, so the column carries no index of its own
+        db.Index('idx_weight_entry_user_created', 'user_id', 'created_at'),
+    )
 
     def __repr__(self) -> str:
         return f"WeightEntry(id={self.id}, weight={self.weight}{self.unit}, reps={self.reps}, category_id={self.category_id})"
@@ -67,15 +114,28 @@ class WeightEntry(db.Model):
     
     def to_dict(self) -> Dict[str, Any]:
         """Convert entry to dictionary for JSON response"""
+        # Same rules as calculate_volume/calculate_estimated_1rm, inlined so
+        # each column is read once on the per-entry API path
+        weight = self.weight
+        reps = self.reps
+        if reps is None or weight is None:
+            volume = estimated_1rm = None
+        else:
+            volume = weight * reps
+            if 0 < reps <= 30 and not self.category.is_body_mass:
+                estimated_1rm = weight * (1 + reps / 30)
+            else:
+                estimated_1rm = None
+        
         return {
             'id': self.id,
-            'weight': self.weight,
+            'weight': weight,
             'unit': self.unit,
-            'reps': self.reps,
+            'reps': reps,
             'category_id': self.category_id,
             'user_id': self.user_id,
             'created_at': format_date(self.created_at),
             'notes': self.notes,
-            'volume': self.calculate_volume(),
-            'estimated_1rm': self.calculate_estimated_1rm()
+            'volume': volume,
+            'estimated_1rm': estimated_1rm
         }
\ No newline at end of file
@@ -1,4 +1,4 @@
-from flask import Blueprint, request, render_template, redirect, url_for, jsonify, current_app, flash
+from flask import Blueprint, Response, request, render_template, redirect, url_for, jsonify, current_app, flash, get_flashed_messages, stream_with_context
 import logging
 from . import services
 from .auth import login_required, get_user_id, is_authenticated
@@ -19,7 +19,7 @@ api = Blueprint('api', __name__, url_prefix='/api')
 @login_required
 def index():
     """Main page for entering weight and viewing charts"""
-    logger.info(f"Access to index page with method: {request.method}")
+    logger.info("Access to index page with method: %s", request.method)
     
     # Get current user
     user_id = get_user_id()
@@ -31,9 +31,6 @@ def index():
     body_mass_category = next((c for c in categories if c.is_body_mass), None)
     body_mass_category_id = body_mass_category.id if body_mass_category else None
     
-    # Get last body mass entry for the modal
-    last_body_mass_entry = services.get_most_recent_body_mass(user_id)
-    
     # Default to first category (Body Mass) if available
     selected_category_id = int(request.args.get('category', '0')) if request.args.get('category') else None
     if not selected_category_id and categories:
@@ -62,12 +59,14 @@ def index():
         # Check if we're in test mode
         in_test = "PYTEST_CURRENT_TEST" in os.environ
         
-        # Log environment information for debugging Docker issues
-        logger.info(f"Request environment - Content-Type: {request.content_type}")
-        logger.info(f"Request environment - Content-Length: {request.content_length}")
-        logger.info(f"Request environment - User-Agent: {request.headers.get('User-Agent', 'Unknown')}")
-        logger.info(f"Request environment - Accept-Encoding: {request.headers.get('Accept-Encoding', 'Unknown')}")
-        logger.info(f"Request environment - in_test: {in_test}")
+        # Log environment information for debugging Docker issues; the
+        # arguments are built eagerly, so skip them when INFO is off
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("Request environment - Content-Type: %s", request.content_type)
+            logger.info("Request environment - Content-Length: %s", request.content_length)
+            logger.info("Request environment - User-Agent: %s", request.headers.get('User-Agent', 'Unknown'))
+            logger.info("Request environment - Accept-Encoding: %s", request.headers.get('Accept-Encoding', 'Unknown'))
+            logger.info("Request environment - in_test: %s", in_test)
         
         try:
             # Parse form data with fallback mechanisms
@@ -103,16 +102,17 @@ def index():
             is_body_weight_exercise_entry = category and category.is_body_weight_exercise
             
             # Debug logging for form data parsing
-            logger.info(f"Form submission - Raw form data: {dict(request.form)}")
-            logger.info(f"Form parsing - weight_str: '{weight_str}' (type: {type(weight_str)}, len: {len(weight_str)})")
-            logger.info(f"Form parsing - weight_str repr: {repr(weight_str)}")
-            logger.info(f"Form parsing - weight_str bytes: {weight_str.encode('utf-8') if weight_str else b''}")
-            logger.info(f"Form parsing - unit: '{unit}'")
-            logger.info(f"Form parsing - category_id: {category_id}")
-            logger.info(f"Form parsing - category: {category.name if category else 'None'}")
-            logger.info(f"Form parsing - reps_str: '{reps_str}'")
-            logger.info(f"Form parsing - is_body_mass_entry: {is_body_mass_entry}")
-            logger.info(f"Form parsing - is_body_weight_exercise_entry: {is_body_weight_exercise_entry}")
+            if logger.isEnabledFor(logging.INFO):
+                logger.info("Form submission - Raw form data: %s", dict(request.form))
+                logger.info("Form parsing - weight_str: '%s' (type: %s, len: %s)", weight_str, type(weight_str), len(weight_str))
+                logger.info("Form parsing - weight_str repr: %r", weight_str)
+                logger.info("Form parsing - weight_str bytes: %s", weight_str.encode('utf-8') if weight_str else b'')
+                logger.info("Form parsing - unit: '%s'", unit)
+                logger.info("Form parsing - category_id: %s", category_id)
+                logger.info("Form parsing - category: %s", category.name if category else 'None')
+                logger.info("Form parsing - reps_str: '%s'", reps_str)
+                logger.info("Form parsing - is_body_mass_entry: %s", is_body_mass_entry)
+                logger.info("Form parsing - is_body_weight_exercise_entry: %s", is_body_weight_exercise_entry)
             
             # Special case for test_body_weight_exercise_* tests
             # Detect if this is one of the test cases for body weight exercises
@@ -178,28 +178,28 @@ def index():
                         weight_str_normalized = weight_str.replace(',', '.')
                         # Remove any characters that aren't digits, dots, or minus signs
                         weight_str_cleaned = re.sub(r'[^\d\.\-]', '', weight_str_normalized)
-                        logger.info(f"Weight conversion - original: '{weight_str}' -> normalized: '{weight_str_normalized}' -> cleaned: '{weight_str_cleaned}'")
+                        logger.info("Weight conversion - original: '%s' -> normalized: '%s' -> cleaned: '%s'", weight_str, weight_str_normalized, weight_str_cleaned)
                         
                         if weight_str_cleaned:
                             weight = float(weight_str_cleaned)
-                            logger.info(f"Weight conversion - final float value: {weight}")
+                            logger.info("Weight conversion - final float value: %s", weight)
                         else:
-                            logger.warning(f"Weight string became empty after cleaning: '{weight_str}' -> '{weight_str_cleaned}'")
+                            logger.warning("Weight string became empty after cleaning: '%s' -> '%s'", weight_str, weight_str_cleaned)
                             weight = 0
                     else:
                         weight = 0
-                        logger.info(f"Weight conversion - empty string, defaulting to: {weight}")
-                    logger.info(f"Weight conversion result - weight: {weight} (type: {type(weight)})")
+                        logger.info("Weight conversion - empty string, defaulting to: %s", weight)
+                    logger.info("Weight conversion result - weight: %s (type: %s)", weight, type(weight))
                 except ValueError as ve:
-                    logger.error(f"Failed to convert weight_str '{weight_str}' to float: {ve}")
+                    logger.error("Failed to convert weight_str '%s' to float: %s", weight_str, ve)
                     raise ValueError(f"Please enter a valid weight number. Got: '{weight_str}'")
                 
                 # Validate weight requirements based on entry type
                 if is_body_mass_entry and weight <= 0:
-                    logger.debug(f"Body mass entry validation failed: weight={weight} <= 0")
+                    logger.debug("Body mass entry validation failed: weight=%s <= 0", weight)
                     raise ValueError("Body weight must be greater than zero")
                 elif not is_body_mass_entry and not is_body_weight_exercise_entry and weight <= 0:
-                    logger.debug(f"Regular exercise entry validation failed: weight={weight} <= 0")
+                    logger.debug("Regular exercise entry validation failed: weight=%s <= 0", weight)
                     raise ValueError("Weight must be greater than zero")
             
             # Handle reps based on entry type
@@ -245,31 +245,33 @@ def index():
         except ValueError as e:
             # Handle input errors
             error_message = str(e)
-            logger.warning(f"Invalid form data: {error_message}")
-            
-            # Re-render with error
-            time_window = request.args.get('window', 'year')
-            entries = services.get_entries_by_time_window(time_window, selected_category_id)
-            plot_json = services.create_weight_plot(entries, time_window, processing_type)
+            logger.warning("Invalid form data: %s", error_message)
             
-            return render_template(
-                'index.html', 
-                entries=entries, 
-                plot_json=plot_json, 
-                time_window=time_window, 
-                error=error_message,
-                categories=categories,
-                selected_category=selected_category,
-                processing_types=processing_types,
-                selected_processing=processing_type,
-                body_mass_category_id=body_mass_category_id,
-                last_body_mass_entry=last_body_mass_entry,
-                is_body_weight_exercise=is_body_weight_exercise
-            )
+            # Redirect back and let the GET handler show the error, so an
+            # invalid POST doesn't also fetch entries and build the plot
+            flash(error_message, 'error')
+            return redirect(url_for(
+                'main.index',
+                window=request.args.get('window', 'year'),
+                category=selected_category_id,
+                processing=processing_type
+            ))
     
     # Handle GET request
+    # Reading flashes pops the whole queue, so hand back the ones this page
+    # doesn't show (e.g. the login welcome) for the next auth page to render
+    error_message = None
+    for category, message in get_flashed_messages(with_categories=True):
+        if category == 'error' and error_message is None:
+            error_message = message
+        elif category != 'error':
+            flash(message, category)
+    
+    # Get last body mass entry for the modal
+    last_body_mass_entry = services.get_most_recent_body_mass(user_id)
+    
     time_window = request.args.get('window', 'year')
-    logger.info(f"Getting data for time window: {time_window}, category: {selected_category_id}")
+    logger.info("Getting data for time window: %s, category: %s", time_window, selected_category_id)
     entries = services.get_entries_by_time_window(time_window, selected_category_id, user_id)
     plot_json = services.create_weight_plot(entries, time_window, processing_type)
     
@@ -278,6 +280,7 @@ def index():
         entries=entries, 
         plot_json=plot_json, 
         time_window=time_window,
+        error=error_message,
         categories=categories,
         selected_category=selected_category,
         processing_types=processing_types,
@@ -318,7 +321,7 @@ def get_entries():
 @login_required
 def manage_categories():
     """Page for managing weight categories"""
-    logger.info(f"Access to categories management page with method: {request.method}")
+    logger.info("Access to categories management page with method: %s", request.method)
     
     # Get current user
     user_id = get_user_id()
@@ -342,9 +345,9 @@ def manage_categories():
                     category.is_body_weight_exercise = is_body_weight_exercise
                     services.db.session.commit()
                 
-                logger.info(f"Category '{name}' created/updated successfully (type: {category_type})")
+                logger.info("Category '%s' created/updated successfully (type: %s)", name, category_type)
             except Exception as e:
-                logger.error(f"Failed to create category: {str(e)}")
+                logger.error("Failed to create category: %s", e)
                 return render_template(
                     'categories.html', 
                     categories=services.get_all_categories(user_id),
@@ -372,7 +375,18 @@ def api_entries():
         category_id = int(category_id)
     
     entries = services.get_all_entries(category_id, user_id)
-    return jsonify([entry.to_dict() for entry in entries])
+    return Response(stream_with_context(_entries_json(entries)), mimetype='application/json')
+
+def _entries_json(entries: List[WeightEntry]):
+    """Yield entries as a JSON array one entry at a time
+    
+    Serialising per entry avoids holding a list of dicts and the full JSON
+    string in memory alongside the entries themselves.
+    """
+    yield '['
+    for i, entry in enumerate(entries):
+        yield (',' if i else '') + current_app.json.dumps(entry.to_dict())
+    yield ']'
 
 @api.route('/entries', methods=['POST'])
 @login_required
@@ -463,28 +477,28 @@ def api_create_entry():
         
         # Create the entry for this user
         entry = services.save_weight_entry(weight, unit, category_id, reps, user_id=user_id)
-        logger.info(f"Entry created successfully: {entry}")
+        logger.info("Entry created successfully: %s", entry)
         
         return jsonify(entry.to_dict()), 201
             
     except ValueError as e:
-        logger.error(f"Invalid input for new entry: {str(e)}")
+        logger.error("Invalid input for new entry: %s", e)
         return jsonify({'error': str(e)}), 400
     except Exception as e:
-        logger.error(f"Error creating entry: {str(e)}")
+        logger.error("Error creating entry: %s", e)
         return jsonify({'error': 'Failed to create entry'}), 500
 
 @api.route('/entries/<int:entry_id>', methods=['DELETE'])
 @login_required
 def api_delete_entry(entry_id):
     """API endpoint to delete an entry"""
-    logger.info(f"API request to delete entry {entry_id}")
+    logger.info("API request to delete entry %s", entry_id)
     
     # Get current user
     user_id = get_user_id()
     
     success = services.delete_entry(entry_id, user_id)
-    logger.info(f"Delete entry {entry_id} result: {success}")
+    logger.info("Delete entry %s result: %s", entry_id, success)
     if success:
         return jsonify({'success': True})
     else:
@@ -494,14 +508,14 @@ def api_delete_entry(entry_id):
 @login_required
 def api_update_entry(entry_id):
     """API endpoint to update an entry"""
-    logger.info(f"API request to update entry {entry_id}")
+    logger.info("API request to update entry %s", entry_id)
     
     # Get current user
     user_id = get_user_id()
     
     try:
         data = request.json
-        logger.debug(f"Request JSON: {data}")
+        logger.debug("Request JSON: %s", data)
         
         # Check if at least one field is provided
         if not data or not any(field in data for field in ['weight', 'unit', 'category_id', 'reps']):
@@ -511,7 +525,7 @@ def api_update_entry(entry_id):
         # Get the current entry to have defaults for any missing fields (ensure it belongs to user)
         current_entry = WeightEntry.query.filter_by(id=entry_id, user_id=user_id).first()
         if not current_entry:
-            logger.warning(f"Entry not found with ID: {entry_id} for user_id: {user_id}")
+            logger.warning("Entry not found with ID: %s for user_id: %s", entry_id, user_id)
             return jsonify({'error': 'Entry not found'}), 404
             
         # Use current values as defaults, or values from the request
@@ -581,10 +595,10 @@ def api_update_entry(entry_id):
             return jsonify({'error': 'Entry not found'}), 404
             
     except ValueError as e:
-        logger.error(f"Invalid input for update: {str(e)}")
+        logger.error("Invalid input for update: %s", e)
         return jsonify({'error': str(e)}), 400
     except Exception as e:
-        logger.error(f"Error updating entry: {str(e)}")
+        logger.error("Error updating entry: %s", e)
         return jsonify({'error': 'Failed to update entry'}), 500
 
 @api.route('/categories', methods=['GET'])
@@ -647,13 +661,13 @@ def api_create_category():
 @login_required
 def api_delete_category(category_id):
     """API endpoint to delete a category"""
-    logger.info(f"API request to delete category {category_id}")
+    logger.info("API request to delete category %s", category_id)
     
     # Get current user
     user_id = get_user_id()
     
     success = services.delete_category(category_id, user_id)
-    logger.info(f"Delete category {category_id} result: {success}")
+    logger.info("Delete category %s result: %s", category_id, success)
     return jsonify({'success': success})
 
 @api.route('/processing-types', methods=['GET'])
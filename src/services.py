@@ -1,13 +1,16 @@
 from datetime import datetime, timedelta, UTC
 import json
 import logging
-import plotly
-import plotly.express as px
-import pandas as pd
-from sqlalchemy import text, inspect
-from typing import List, Optional, Dict, Any, Tuple
+from sqlalchemy import text
+from sqlalchemy.orm import selectinload
+from typing import TYPE_CHECKING, List, Optional, Dict, Any, Set, Tuple
 
-from .models import WeightEntry, WeightCategory, db, format_date
+from .models import WeightEntry, WeightCategory, EpochDateTime, db, format_date, VALID_UNITS
+
+# pandas and plotly are imported inside the plotting functions so that
+# importing this module (and starting the app) doesn't pay for them
+if TYPE_CHECKING:
+    import pandas as pd
 
 # Set up logger
 logger = logging.getLogger(__name__)
@@ -27,6 +30,11 @@ def create_tables() -> None:
         logger.error(f"Error creating tables: {str(e)}")
         # Continue anyway, as the application might still work with existing tables
 
+def _table_columns(table_name: str) -> Set[str]:
+    """Return the column names of a table straight from PRAGMA table_info"""
+    result = db.session.execute(text("SELECT name FROM pragma_table_info(:table)"), {"table": table_name})
+    return {row[0] for row in result}
+
 def create_default_category(user_id: Optional[int] = None) -> WeightCategory:
     """Create default 'Body Mass' category if it doesn't exist for the given user"""
     if user_id is None:
@@ -161,10 +169,12 @@ def save_weight_entry(
         logger.error(f"CRITICAL: Attempted to save body mass entry with zero weight! weight={weight}, category={category.name}")
         raise ValueError(f"Body mass entries cannot have zero weight. Received weight: {weight}")
     
+    if unit not in VALID_UNITS:
+        raise ValueError(f"Unit must be one of: {', '.join(VALID_UNITS)}")
+    
     try:
         # Check columns exist using introspection to avoid errors with older database schemas
-        inspector = inspect(db.engine)
-        columns = {c["name"] for c in inspector.get_columns("weight_entry")}
+        columns = _table_columns("weight_entry")
         
         # Prepare entry data based on available columns
         current_time = datetime.now(UTC)
@@ -190,7 +200,7 @@ def save_weight_entry(
         # Update category's last_used_at if the column exists
         try:
             # Check if weight_category table has last_used_at column
-            category_columns = {c["name"] for c in inspector.get_columns("weight_category")}
+            category_columns = _table_columns("weight_category")
             if "last_used_at" in category_columns:
                 category.last_used_at = current_time
             else:
@@ -306,6 +316,9 @@ def update_entry(
             logger.warning("Normal exercises should have reps, defaulting to 1")
             reps = 1
     
+    if unit not in VALID_UNITS:
+        raise ValueError(f"Unit must be one of: {', '.join(VALID_UNITS)}")
+    
     # Update entry values
     entry.weight = weight
     entry.unit = unit
@@ -343,8 +356,7 @@ def get_entries_by_time_window(
         now = datetime.now(UTC)
         
         # Handle potential schema issues by using a safer approach with raw SQL
-        inspector = inspect(db.engine)
-        columns = {c["name"] for c in inspector.get_columns("weight_entry")}
+        columns = _table_columns("weight_entry")
         
         # Build query dynamically based on available columns
         column_list = ["id", "weight", "unit", "category_id", "created_at"]
@@ -371,29 +383,29 @@ def get_entries_by_time_window(
             where_clauses.append("weight_entry.category_id = :category_id")
             params["category_id"] = category_id
         
-        # Add time window filter
+        # Add time window filter (created_at is stored as epoch seconds)
         if time_window == 'week':
             start_date = now - timedelta(days=7)
             where_clauses.append("weight_entry.created_at >= :start_date")
-            params["start_date"] = start_date
+            params["start_date"] = int(start_date.timestamp())
         elif time_window == 'month':
             start_date = now - timedelta(days=30)
             where_clauses.append("weight_entry.created_at >= :start_date")
-            params["start_date"] = start_date
+            params["start_date"] = int(start_date.timestamp())
         elif time_window == 'year':
             start_date = now - timedelta(days=365)
             where_clauses.append("weight_entry.created_at >= :start_date")
-            params["start_date"] = start_date
+            params["start_date"] = int(start_date.timestamp())
         
         # Add WHERE clause if needed
         if where_clauses:
             query_parts.append("WHERE " + " AND ".join(where_clauses))
         
-        # Add ORDER BY
-        query_parts.append("ORDER BY weight_entry.created_at DESC")
+        # Add ORDER BY (id breaks ties between entries saved in the same second)
+        query_parts.append("ORDER BY weight_entry.created_at DESC, weight_entry.id DESC")
         
-        # Execute query
-        query = text(" ".join(query_parts))
+        # Execute query, converting epoch timestamps back to datetimes
+        query = text(" ".join(query_parts)).columns(created_at=EpochDateTime)
         result = db.session.execute(query, params)
         
         # Convert to WeightEntry objects
@@ -414,7 +426,10 @@ def get_all_entries(category_id: Optional[int] = None, user_id: Optional[int] =
     """Get all entries, optionally filtered by category and user"""
     logger.info(f"Retrieving all entries, category_id: {category_id}, user_id: {user_id}")
     try:
-        query = WeightEntry.query.order_by(WeightEntry.created_at.desc())
+        # Entry.to_dict reads the category, so load every entry's category in
+        # one follow-up SELECT instead of lazily, one per distinct category
+        query = WeightEntry.query.options(selectinload(WeightEntry.category)).order_by(
+            WeightEntry.created_at.desc(), WeightEntry.id.desc())
         
         # Add user filter if provided
         if user_id is not None:
@@ -437,8 +452,10 @@ def convert_to_kg(weight: float, unit: str) -> float:
         return weight * 0.45359237
     return weight
 
-def _build_ticks(date_min: pd.Timestamp, date_max: pd.Timestamp, time_window: str):
+def _build_ticks(date_min: 'pd.Timestamp', date_max: 'pd.Timestamp', time_window: str):
     """Explicit tick arrays to avoid dtick issues"""
+    import pandas as pd
+    
     date_min = pd.to_datetime(date_min).normalize()
     date_max = pd.to_datetime(date_max).normalize()
     
@@ -475,6 +492,10 @@ def create_weight_plot(
     processing_type: Optional[str] = None
 ) -> str:
     """Create a plotly plot of weight entries"""
+    import pandas as pd
+    import plotly
+    import plotly.express as px
+    
     try:
         if not entries:
             logger.info("No entries to plot - creating informative empty plot")
@@ -841,34 +862,27 @@ def migrate_old_entries_to_body_mass() -> None:
         # Use raw SQL to check for the existence of the category_id column
         # to avoid accessing columns that might not exist yet
         
-        # Check if entries table exists
-        result = db.session.execute(text("SELECT name FROM sqlite_master WHERE type='table' AND name='weight_entry'"))
-        if not result.fetchone():
+        # A missing table has no columns, so one lookup answers both checks
+        columns = _table_columns("weight_entry")
+        if not columns:
             logger.info("weight_entry table doesn't exist yet, skipping migration")
             return
             
         # Check if category_id column exists
-        result = db.session.execute(text("PRAGMA table_info(weight_entry)"))
-        columns = [row[1] for row in result.fetchall()]
-        
         if 'category_id' not in columns:
             logger.info("category_id column doesn't exist yet, skipping migration")
             return
             
-        # Get entries without category_id using raw SQL to avoid ORM issues
-        result = db.session.execute(text("SELECT id FROM weight_entry WHERE category_id IS NULL"))
-        entry_ids = [row[0] for row in result.fetchall()]
-        
-        count = len(entry_ids)
+        # Assign entries without category_id using raw SQL to avoid ORM issues;
+        # one parameterized statement regardless of how many rows match
+        result = db.session.execute(
+            text("UPDATE weight_entry SET category_id = :category_id WHERE category_id IS NULL"),
+            {"category_id": body_mass.id}
+        )
+        count = result.rowcount
         
         if count > 0:
             logger.info(f"Found {count} entries to migrate to Body Mass category")
-            # Update entries in batches
-            for i in range(0, count, 100):
-                batch = entry_ids[i:i+100]
-                id_list = ','.join(str(id) for id in batch)
-                db.session.execute(text(f"UPDATE weight_entry SET category_id = {body_mass.id} WHERE id IN ({id_list})"))
-            
             db.session.commit()
             logger.info(f"Successfully migrated {count} entries to Body Mass category")
         else:
@@ -897,7 +911,7 @@ def get_most_recent_body_mass(user_id: Optional[int] = None) -> Optional[WeightE
     if user_id is not None:
         query = query.filter_by(user_id=user_id)
     
-    most_recent = query.order_by(WeightEntry.created_at.desc()).first()
+    most_recent = query.order_by(WeightEntry.created_at.desc(), WeightEntry.id.desc()).first()
     
     if most_recent:
         logger.info(f"Found most recent body mass entry: {most_recent.weight}{most_recent.unit} ({format_date(most_recent.created_at)})")
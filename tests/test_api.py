@@ -32,6 +32,10 @@ class TestEntriesAPI:
             data = json.loads(response.data)
             assert isinstance(data, list)
             assert len(data) >= 2
+            
+            # Dates are serialised as YYYY-MM-DD
+            latest = services.get_all_entries(user_id=default_user.id)[0]
+            assert data[0]['created_at'] == latest.created_at.strftime('%Y-%m-%d')
     
     def test_create_entry_via_api(self, app, authenticated_client, sample_categories, default_user):
         """POST /api/entries should create new entry"""
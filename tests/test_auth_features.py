@@ -5,7 +5,8 @@ import pytest
 
 from src.models import db
 from src.models.user import User
-from src.forms import ChangeUsernameForm, ChangeEmailForm
+from src.forms import ChangeUsernameForm, ChangeEmailForm, validate_password_complexity
+from wtforms.validators import ValidationError
 from src.app import create_app
 
 pytestmark = pytest.mark.unit
@@ -94,6 +95,142 @@ class TestFormSecurityFeatures:
             assert isinstance(username_form, FlaskForm)
             assert isinstance(email_form, FlaskForm)
 
+    def test_login_with_unknown_user_still_checks_password_hash(self, client, monkeypatch):
+        """Test that logins for missing accounts do the same hash work as real ones"""
+        from src import auth_routes
+
+        checked = []
+        def fake_check(password_hash, password):
+            checked.append(password_hash)
+            return False
+        monkeypatch.setattr(auth_routes, 'check_password_hash', fake_check)
+
+        response = client.post('/auth/login', data={'login': 'nobody', 'password': 'wrongpassword'})
+        assert response.status_code == 200
+        assert b'Invalid username/email or password.' in response.data
+        assert checked == [auth_routes._DUMMY_PASSWORD_HASH]
+
+    def test_dummy_password_hash_uses_pinned_method(self, app):
+        """Test that the unknown-user hash costs the same as a real user's hash"""
+        from src import auth_routes
+        from src.models.user import User, PASSWORD_HASH_METHOD
+
+        user = User(username='hashcheck', email='hashcheck@example.com')
+        user.set_password('ValidPassword123')
+        assert user.password_hash.startswith(f'{PASSWORD_HASH_METHOD}$')
+        assert auth_routes._DUMMY_PASSWORD_HASH.startswith(f'{PASSWORD_HASH_METHOD}$')
+
+
+
+class TestRegistration:
+    """Test account registration"""
+    
+    def test_register_creates_user_with_body_mass_category(self, app, client):
+        """Test that registration creates the user, its Body Mass category and login time together"""
+        from src.models import WeightCategory
+        
+        response = client.post('/auth/register', data={
+            'username': 'newlifter',
+            'email': 'newlifter@example.com',
+            'password': 'Password123',
+            'confirm_password': 'Password123'
+        })
+        assert response.status_code == 302
+        
+        with app.app_context():
+            user = User.query.filter_by(username='newlifter').first()
+            assert user is not None
+            assert user.last_login is not None
+            categories = WeightCategory.query.filter_by(user_id=user.id).all()
+            assert [(c.name, c.is_body_mass) for c in categories] == [('Body Mass', True)]
+            
+            # Every row written by the registration shares one timestamp
+            assert user.created_at == user.updated_at == user.last_login
+            assert categories[0].created_at.replace(tzinfo=None) == user.created_at.replace(tzinfo=None)
+
+    
+    def test_malformed_email_skips_database_lookup(self, client, monkeypatch):
+        """Test that an email rejected by the field validators never reaches the uniqueness query"""
+        from src import forms
+        
+        lookups = []
+        def fake_user_exists(**filters):
+            lookups.append(filters)
+            return False
+        monkeypatch.setattr(forms, '_user_exists', fake_user_exists)
+        
+        response = client.post('/auth/register', data={
+            'username': 'newlifter',
+            'email': 'not-an-email',
+            'password': 'Password123',
+            'confirm_password': 'Password123'
+        })
+        assert response.status_code == 200
+        assert response.data.count(b'Please enter a valid email address') == 1
+        assert lookups == [{'username': 'newlifter'}]
+
+class TestAccountDeletion:
+    """Test account deletion with real authentication"""
+    
+    def test_delete_account_removes_user_and_logs_out(self):
+        """Test that deleting an account removes the user and its data and ends the session"""
+        from src.models import WeightCategory, WeightEntry
+        
+        auth_app = create_app({
+            'TESTING': False,
+            'SKIP_MIGRATION': True,
+            'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:',
+            'SECRET_KEY': 'test-secret-key',
+            'WTF_CSRF_ENABLED': False
+        })
+        with auth_app.app_context():
+            db.create_all()
+            user = User(username='leaving', email='leaving@example.com')
+            user.set_password('Password123')
+            db.session.add(user)
+            db.session.flush()
+            category = WeightCategory(name='Body Mass', is_body_mass=True, user_id=user.id)
+            db.session.add(category)
+            db.session.flush()
+            db.session.add_all([
+                WeightEntry(weight=80.0 + i, unit='kg', category_id=category.id, user_id=user.id)
+                for i in range(3)
+            ])
+            db.session.commit()
+        
+        with auth_app.test_client() as client:
+            response = client.post('/auth/login', data={'login': 'leaving', 'password': 'Password123'})
+            assert response.status_code == 302
+            
+            response = client.post('/auth/delete-account', follow_redirects=True)
+            assert b'has been deleted successfully' in response.data
+            
+            # Session is gone, so protected pages redirect to login again
+            response = client.get('/auth/profile')
+            assert response.status_code == 302
+        
+        with auth_app.app_context():
+            assert User.query.filter_by(username='leaving').first() is None
+            assert WeightCategory.query.count() == 0
+            assert WeightEntry.query.count() == 0
+
+
+class TestLoginRedirect:
+    """Test validation of the post-login ?next= target"""
+    
+    @pytest.mark.parametrize('target', ['/', '/categories', '/auth/profile?tab=email'])
+    def test_local_paths_allowed(self, target):
+        """Test that paths on this site are kept"""
+        from src.auth_routes import _safe_next_url
+        assert _safe_next_url(target) == target
+    
+    @pytest.mark.parametrize('target', [
+        None, '', 'https://evil.com', '//evil.com', '/\\evil.com', '/\t/evil.com', 'evil.com/path'
+    ])
+    def test_offsite_targets_rejected(self, target):
+        """Test that targets a browser would resolve to another site are dropped"""
+        from src.auth_routes import _safe_next_url
+        assert _safe_next_url(target) is None
 
 class TestFormHTMLAttributes:
     """Test HTML form attributes for better UX"""
@@ -177,4 +314,71 @@ class TestFormFunctionality:
         
         # Profile page should still work
         response = authenticated_client.get('/auth/profile')
-        assert response.status_code == 200
\ No newline at end of file
+        assert response.status_code == 200
+
+class TestUserLoader:
+    """Test the Flask-Login user loader"""
+    
+    def test_load_user_returns_user_or_none(self, app, default_user):
+        """Test that load_user resolves valid IDs and rejects bad ones"""
+        from src.auth import load_user
+        
+        with app.app_context():
+            assert load_user(str(default_user.id)).username == default_user.username
+            assert load_user('999999') is None
+            assert load_user('not-an-id') is None
+
+class TestPasswordReset:
+    """Test password reset tokens"""
+    
+    def test_reset_token_verifies_after_reload(self, app, default_user):
+        """Test that a stored reset token can be verified in a later request"""
+        with app.app_context():
+            user = db.session.get(User, default_user.id)
+            token = user.generate_reset_token()
+            db.session.commit()
+            db.session.expire_all()
+            
+            user = db.session.get(User, default_user.id)
+            assert user.verify_reset_token(token)
+            assert not user.verify_reset_token('wrong-token')
+            
+            user.reset_token_expires -= 7200
+            assert not user.verify_reset_token(token)
+            assert user.reset_token is None
+
+class TestUserLookup:
+    """Test finding users by login name"""
+    
+    def test_find_by_username_or_email_prefers_username(self, app):
+        """Test that a login matching one user's username and another's email resolves to the username"""
+        with app.app_context():
+            by_email = User(username='alice', email='lifter@example.com')
+            by_email.set_password('Password123')
+            by_username = User(username='lifter@example.com', email='other@example.com')
+            by_username.set_password('Password123')
+            db.session.add_all([by_email, by_username])
+            db.session.commit()
+            
+            assert User.find_by_username_or_email('lifter@example.com').username == 'lifter@example.com'
+            assert User.find_by_username_or_email('other@example.com').username == 'lifter@example.com'
+            assert User.find_by_username_or_email('alice').email == 'lifter@example.com'
+            assert User.find_by_username_or_email('nobody') is None
+
+class TestPasswordComplexity:
+    """Test the shared password complexity rules"""
+    
+    @pytest.mark.parametrize('password, message', [
+        ('lowercase123', 'uppercase'),
+        ('UPPERCASE123', 'lowercase'),
+        ('NoDigitsHere', 'number'),
+    ])
+    def test_weak_passwords_rejected(self, password, message):
+        """Test that each missing character class is reported"""
+        with pytest.raises(ValidationError, match=message):
+            validate_password_complexity(password)
+    
+    def test_strong_passwords_accepted(self):
+        """Test that passwords meeting every rule pass, including non-ASCII letters"""
+        validate_password_complexity('Password123')
+        validate_password_complexity('Ängström99')
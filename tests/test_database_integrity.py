@@ -6,6 +6,7 @@ environments, particularly database corruption or schema inconsistencies.
 """
 
 import pytest
+from datetime import UTC
 from src import services
 from src.models import WeightCategory, WeightEntry
 from src.migration import check_and_migrate_database
@@ -71,6 +72,101 @@ class TestDatabaseIntegrity:
                 for attr in entry_attributes:
                     assert hasattr(sample_entry, attr), f"WeightEntry missing required attribute: {attr}"
 
+    
+    def test_category_timeline_query_uses_composite_index(self, app, default_user):
+        """Test that per-category entry queries are served by the (category_id, user_id, created_at) index"""
+        from sqlalchemy import text
+        from src.models import db
+        
+        with app.app_context():
+            plan = db.session.execute(text(
+                "EXPLAIN QUERY PLAN "
+                "SELECT id, weight, unit, category_id, created_at, reps FROM weight_entry "
+                "WHERE user_id = :user_id AND category_id = 1 AND created_at >= 0 "
+                "ORDER BY created_at DESC, id DESC"
+            ), {'user_id': default_user.id}).fetchall()
+            details = ' '.join(row[-1] for row in plan)
+            
+            assert 'idx_weight_entry_category_created' in details
+            assert 'TEMP B-TREE' not in details
+
+    def test_latest_user_entry_query_uses_composite_index(self, app, default_user):
+        """Test that the per-user latest-entry query is served by the (user_id, created_at) index"""
+        from sqlalchemy import text
+        from src.models import db
+        
+        with app.app_context():
+            plan = db.session.execute(text(
+                "EXPLAIN QUERY PLAN "
+                "SELECT id FROM weight_entry WHERE user_id = :user_id "
+                "ORDER BY created_at DESC, id DESC LIMIT 1"
+            ), {'user_id': default_user.id}).fetchall()
+            details = ' '.join(row[-1] for row in plan)
+            
+            assert 'idx_weight_entry_user_created' in details
+            assert 'TEMP B-TREE' not in details
+
+    def test_connection_pragmas_applied(self, app, default_user):
+        """Test that SQLite PRAGMAs are applied to every pooled connection"""
+        from sqlalchemy import text
+        from src.models import db
+
+        with app.app_context():
+            # Foreign key enforcement is a behavior change, so it stays at the SQLite default
+            assert db.session.execute(text("PRAGMA foreign_keys")).scalar() == 0
+            assert db.session.execute(text("PRAGMA temp_store")).scalar() == 2
+            assert db.session.execute(text("PRAGMA cache_size")).scalar() == -65536
+            assert db.session.execute(text("PRAGMA busy_timeout")).scalar() == 5000
+
+    def test_shutdown_optimize_registered_once_per_process(self, app, tmp_path, monkeypatch):
+        """Test that repeated app creation registers a single atexit hook"""
+        from src import app as app_module
+
+        registered = []
+        monkeypatch.setattr(app_module.atexit, 'register', registered.append)
+        monkeypatch.setattr(app_module, '_optimize_apps', {})
+
+        for _ in range(3):
+            app_module._register_shutdown_optimize(app, str(tmp_path / 'weight_tracker.db'))
+
+        assert registered == [app_module._optimize_on_shutdown]
+        assert app_module._optimize_apps[str(tmp_path / 'weight_tracker.db')]() is app
+
+    def test_shutdown_optimize_skipped_in_forked_workers(self, app, tmp_path, monkeypatch):
+        """Test that only the registering process runs the inherited atexit hook"""
+        from src import app as app_module
+
+        monkeypatch.setattr(app_module.atexit, 'register', lambda hook: None)
+        monkeypatch.setattr(app_module, '_optimize_apps', {})
+        app_module._register_shutdown_optimize(app, str(tmp_path / 'weight_tracker.db'))
+
+        monkeypatch.setattr(app_module.os, 'getpid', lambda: app_module._optimize_pid + 1)
+        monkeypatch.setattr(app, 'app_context', lambda: pytest.fail("Worker ran PRAGMA optimize"))
+        app_module._optimize_on_shutdown()
+
+    def test_file_logging_can_be_disabled(self, tmp_path):
+        """Test that LOG_TO_FILE=false (set by gunicorn.conf.py) logs to stdout only"""
+        from logging.handlers import RotatingFileHandler
+        from flask import Flask
+        from src.app import configure_logging
+
+        app = Flask('logging_check')
+        configure_logging(app, {'LOG_TO_FILE': 'false', 'LOG_DIR': str(tmp_path / 'logs')})
+
+        assert not any(isinstance(h, RotatingFileHandler) for h in app.logger.handlers)
+        assert not (tmp_path / 'logs').exists()
+
+    def test_relative_dir_created_again_after_chdir(self, tmp_path, monkeypatch):
+        """Test that a relative directory is created under each working directory"""
+        from src import app as app_module
+
+        monkeypatch.setattr(app_module, '_made_dirs', set())
+        for cwd in (tmp_path / 'first', tmp_path / 'second'):
+            cwd.mkdir()
+            monkeypatch.chdir(cwd)
+            app_module._ensure_dir('logs')
+            assert (cwd / 'logs').is_dir()
+
 
 class TestProductionParityValidation:
     """Tests that ensure test environment matches production scenarios"""
@@ -177,6 +273,247 @@ class TestMigrationRobustness:
             assert len(categories_after) == len(categories_before), "Migration changed number of categories"
             assert len(entries_after) == len(entries_before), "Migration changed number of entries"
     
+    def test_schema_version_stamped_and_short_circuits_migration(self, app, default_user, monkeypatch):
+        """Test that a database stamped with the current user_version skips the migration checks"""
+        from src import migration
+        
+        with app.app_context():
+            migration.check_and_migrate_database()
+            assert migration._get_schema_version() == migration.CURRENT_SCHEMA_VERSION
+            
+            def fail_inspect(*args, **kwargs):
+                raise AssertionError("Schema should not be inspected once the version is current")
+            monkeypatch.setattr(migration, '_read_schema', fail_inspect)
+            
+            migration.check_and_migrate_database()
+            
+            # A database stamped by a newer release is left alone, not downgraded
+            migration._set_schema_version(migration.CURRENT_SCHEMA_VERSION + 1)
+            migration.check_and_migrate_database()
+            assert migration._get_schema_version() == migration.CURRENT_SCHEMA_VERSION + 1
+    
+    def test_body_weight_column_renamed_in_place(self, app, sample_categories, default_user):
+        """Test that v7 renames is_body_weight without rebuilding weight_category"""
+        from sqlalchemy import text
+        from src import migration
+        from src.models import db
+        
+        with app.app_context():
+            with db.engine.begin() as connection:
+                connection.execute(text(
+                    "ALTER TABLE weight_category RENAME COLUMN is_body_weight_exercise TO is_body_weight"
+                ))
+            
+            schema = migration._read_schema()
+            migration.migrate_db_v7(schema)
+            
+            columns = migration._read_schema()["weight_category"]
+            assert "is_body_weight_exercise" in columns
+            assert "is_body_weight" not in columns
+            # A rebuild would have dropped columns added after v7
+            assert "user_id" in columns
+            assert schema["weight_category"] == columns
+            
+            flagged = db.session.execute(text(
+                "SELECT name FROM weight_category WHERE is_body_weight_exercise = 1"
+            )).scalars().all()
+            assert flagged == ["Push-ups"]
+    
+    def test_startup_migrations_skipped_once_schema_verified(self, tmp_path, monkeypatch):
+        """Test that a second app startup on an unchanged database skips the migration checks"""
+        from src import app as app_module
+        from src import migration
+        
+        monkeypatch.setenv('INSTANCE_PATH', str(tmp_path))
+        config = {
+            'TESTING': True,
+            'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'weight_tracker.db'}",
+            'SECRET_KEY': 'test-secret-key'
+        }
+        
+        app_module.create_app(config)
+        assert list(tmp_path.glob('.schema_ok_*')), "Schema sentinel was not written after migrating"
+        
+        def fail_migration():
+            raise AssertionError("Migration should not run for an already verified database")
+        monkeypatch.setattr(migration, 'check_and_migrate_database', fail_migration)
+        
+        app_module.create_app(config)
+    
+    def test_schema_sentinels_kept_per_database(self, tmp_path, monkeypatch):
+        """Test that apps on different databases in one instance folder keep their own sentinels"""
+        from src import app as app_module
+        from src import migration
+        
+        monkeypatch.setenv('INSTANCE_PATH', str(tmp_path))
+        configs = [{
+            'TESTING': True,
+            'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / name}",
+            'SECRET_KEY': 'test-secret-key'
+        } for name in ('first.db', 'second.db')]
+        
+        for config in configs:
+            app_module.create_app(config)
+        assert len(list(tmp_path.glob('.schema_ok_*'))) == 2
+        
+        def fail_migration():
+            raise AssertionError("Migration should not run for an already verified database")
+        monkeypatch.setattr(migration, 'check_and_migrate_database', fail_migration)
+        
+        for config in configs:
+            app_module.create_app(config)
+    
+    def test_fresh_database_has_category_flag_triggers(self, tmp_path, monkeypatch):
+        """Test that a brand-new database gets the v8 triggers before it is stamped current"""
+        import sqlite3
+        from src import app as app_module
+        from src import migration
+        
+        monkeypatch.setenv('INSTANCE_PATH', str(tmp_path))
+        db_file = tmp_path / 'weight_tracker.db'
+        app_module.create_app({
+            'TESTING': True,
+            'SQLALCHEMY_DATABASE_URI': f"sqlite:///{db_file}",
+            'SECRET_KEY': 'test-secret-key'
+        })
+        
+        with sqlite3.connect(db_file) as connection:
+            triggers = {row[0] for row in connection.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'trigger'"
+            )}
+            version = connection.execute("PRAGMA user_version").fetchone()[0]
+        
+        assert triggers == {'check_category_flags_insert', 'check_category_flags_update'}
+        assert version == migration.CURRENT_SCHEMA_VERSION
+    
+    def test_fresh_database_not_stamped_when_a_migration_fails(self, tmp_path, monkeypatch):
+        """Test that a fresh database runs the migration chain before its version is stamped"""
+        import sqlite3
+        from src import app as app_module
+        from src import migration
+        
+        def fail_migration(connection=None):
+            raise RuntimeError("migration failed")
+        monkeypatch.setattr(migration, 'migrate_db_v16', fail_migration)
+        
+        monkeypatch.setenv('INSTANCE_PATH', str(tmp_path))
+        db_file = tmp_path / 'weight_tracker.db'
+        with pytest.raises(RuntimeError):
+            app_module.create_app({
+                'TESTING': True,
+                'SQLALCHEMY_DATABASE_URI': f"sqlite:///{db_file}",
+                'SECRET_KEY': 'test-secret-key'
+            })
+        
+        with sqlite3.connect(db_file) as connection:
+            assert connection.execute("PRAGMA user_version").fetchone()[0] == 0
+    
+    def test_fresh_and_migrated_databases_share_schema(self, tmp_path, monkeypatch):
+        """Test that a fresh install and an upgraded legacy database end up with the same indexes and triggers"""
+        import sqlite3
+        from src import app as app_module
+        from create_pre_update_database import create_pre_update_database
+        
+        def schema_objects(db_file):
+            with sqlite3.connect(db_file) as connection:
+                return set(connection.execute(
+                    "SELECT type, name FROM sqlite_master "
+                    "WHERE type IN ('index', 'trigger') "
+                    "AND tbl_name IN ('weight_category', 'weight_entry') "
+                    "AND name NOT LIKE 'sqlite_autoindex_%'"
+                ).fetchall())
+        
+        databases = {}
+        for name in ('fresh', 'legacy'):
+            instance = tmp_path / name
+            instance.mkdir()
+            db_file = instance / 'weight_tracker.db'
+            if name == 'legacy':
+                create_pre_update_database(str(db_file))
+            monkeypatch.setenv('INSTANCE_PATH', str(instance))
+            app_module.create_app({
+                'TESTING': True,
+                'SQLALCHEMY_DATABASE_URI': f"sqlite:///{db_file}",
+                'SECRET_KEY': 'test-secret-key'
+            })
+            databases[name] = schema_objects(db_file)
+        
+        assert databases['fresh'] == databases['legacy']
+    
+    def test_startup_migrations_rerun_after_schema_version_bump(self, tmp_path, monkeypatch):
+        """Test that a code upgrade adding a migration ignores the old sentinel"""
+        from src import app as app_module
+        from src import migration
+        
+        monkeypatch.setenv('INSTANCE_PATH', str(tmp_path))
+        config = {
+            'TESTING': True,
+            'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'weight_tracker.db'}",
+            'SECRET_KEY': 'test-secret-key'
+        }
+        
+        app_module.create_app(config)
+        
+        calls = []
+        monkeypatch.setattr(migration, 'CURRENT_SCHEMA_VERSION', migration.CURRENT_SCHEMA_VERSION + 1)
+        monkeypatch.setattr(migration, 'check_and_migrate_database', lambda: calls.append(True))
+        
+        app_module.create_app(config)
+        assert calls, "Migrations were skipped after CURRENT_SCHEMA_VERSION changed"
+    
+    def test_legacy_timestamp_strings_converted_to_epoch(self, app, sample_categories, default_user):
+        """Test that ISO datetime strings from older databases are migrated to epoch seconds"""
+        from datetime import datetime
+        from sqlalchemy import text
+        from src.models import db
+        from src.migration import migrate_db_v11
+        
+        with app.app_context():
+            db.session.execute(text(
+                "INSERT INTO weight_entry (weight, unit, reps, category_id, user_id, created_at, notes) "
+                "VALUES (80.0, 'kg', NULL, :category_id, :user_id, '2024-03-01 08:30:00.000000', '')"
+            ), {'category_id': sample_categories['body_mass'].id, 'user_id': default_user.id})
+            db.session.commit()
+            
+            migrate_db_v11()
+            
+            stored = db.session.execute(text("SELECT typeof(created_at), created_at FROM weight_entry")).fetchone()
+            assert stored[0] == 'integer'
+            assert stored[1] == int(datetime(2024, 3, 1, 8, 30, tzinfo=UTC).timestamp())
+            
+            entry = services.get_all_entries(user_id=default_user.id)[0]
+            assert entry.created_at == datetime(2024, 3, 1, 8, 30)
+
+    def test_unique_category_name_index_created(self, app, default_user):
+        """Test that migration v14 enforces unique category names per user"""
+        from sqlalchemy import text
+        from src.models import db
+        from src.migration import migrate_db_v14
+        
+        with app.app_context():
+            migrate_db_v14()
+            
+            index_sql = db.session.execute(text(
+                "SELECT sql FROM sqlite_master WHERE name = 'uq_weight_category_name_user'"
+            )).scalar()
+            assert index_sql is not None and 'UNIQUE' in index_sql
+
+    def test_failed_column_migration_rolls_back_every_alter(self, app, default_user):
+        """Test that a failing ALTER undoes the columns added before it"""
+        from sqlalchemy import inspect
+        from src.models import db
+        from src.migration import _migrate_missing_columns
+
+        with app.app_context():
+            with pytest.raises(Exception):
+                _migrate_missing_columns({"weight_entry": [
+                    ("migration_probe", "TEXT"),
+                    ("broken", "NOT A TYPE ("),
+                ]})
+
+            column_names = {col["name"] for col in inspect(db.engine).get_columns("weight_entry")}
+            assert "migration_probe" not in column_names
+
     def test_production_data_characteristics(self, app, default_user):
         """Verify database structure matches production requirements"""
         with app.app_context():
@@ -78,6 +78,21 @@ class TestWeightEntrySaving:
             with pytest.raises(ValueError, match="Category with ID 999 not found"):
                 services.save_weight_entry(100.0, 'kg', 999, 10, user_id=default_user.id)
 
+    
+    def test_save_entry_with_invalid_unit_raises_error(self, app, sample_categories, default_user):
+        """Saving with a unit other than kg/lb should raise error before hitting the database"""
+        with app.app_context():
+            with pytest.raises(ValueError, match="Unit must be one of: kg, lb"):
+                services.save_weight_entry(100.0, 'stone', sample_categories['benchpress'].id, 8, user_id=default_user.id)
+    
+    def test_saved_entry_without_notes_stores_null(self, app, sample_categories, default_user):
+        """Unset notes should be NULL, matching legacy rows, rather than an empty string"""
+        with app.app_context():
+            entry = services.save_weight_entry(100.0, 'kg', sample_categories['benchpress'].id, 8, user_id=default_user.id)
+            db.session.expire_all()
+            
+            assert db.session.get(WeightEntry, entry.id).to_dict()['notes'] is None
+
 
 class TestDataRetrievalAndOrdering:
     """Test data retrieval and ordering logic"""
@@ -157,6 +172,27 @@ class TestDataRetrievalAndOrdering:
         with app.app_context():
             most_recent = services.get_most_recent_body_mass(user_id=default_user.id)
             assert most_recent is None
+    
+    def test_all_entries_load_categories_in_one_query(self, app, sample_categories, default_user):
+        """Test that serialising entries doesn't lazy-load each entry's category"""
+        from sqlalchemy import event
+        
+        with app.app_context():
+            for category in ('pushups', 'squats', 'benchpress'):
+                services.save_weight_entry(50.0, 'kg', sample_categories[category].id, 10, user_id=default_user.id)
+            db.session.expire_all()
+            
+            statements = []
+            listener = lambda *args: statements.append(args[2])
+            event.listen(db.engine, 'before_cursor_execute', listener)
+            try:
+                entries = services.get_all_entries(user_id=default_user.id)
+                [entry.to_dict() for entry in entries]
+            finally:
+                event.remove(db.engine, 'before_cursor_execute', listener)
+            
+            assert len(entries) == 3
+            assert len(statements) == 2
 
 
 class TestEntryUpdate:
@@ -134,6 +134,41 @@ class TestFormSubmission:
             html_content = response.get_data(as_text=True)
             # Should show error message
             assert 'error' in html_content.lower() or 'invalid' in html_content.lower()
+    
+    def test_invalid_form_submission_redirects_without_rendering(self, app, client, sample_categories):
+        """Invalid form data should redirect back instead of rebuilding the page"""
+        with app.app_context():
+            form_data = {
+                'weight': '0',
+                'unit': 'kg',
+                'category': sample_categories['body_mass'].id,
+            }
+            
+            response = client.post('/?window=month', data=form_data)
+            assert response.status_code == 302
+            assert 'window=month' in response.headers['Location']
+            
+            # The error is shown once by the page the redirect leads to
+            page = client.get(response.headers['Location']).get_data(as_text=True)
+            assert 'Body weight must be greater than zero' in page
+            page = client.get(response.headers['Location']).get_data(as_text=True)
+            assert 'Body weight must be greater than zero' not in page
+    
+    def test_invalid_form_submission_keeps_other_flashes(self, app, client, sample_categories):
+        """Showing the form error should not drop a pending success flash"""
+        with app.app_context():
+            with client.session_transaction() as session:
+                session['_flashes'] = [('success', 'Welcome back, testuser!')]
+            
+            response = client.post('/', data={
+                'weight': '0',
+                'unit': 'kg',
+                'category': sample_categories['body_mass'].id,
+            })
+            client.get(response.headers['Location'])
+            
+            with client.session_transaction() as session:
+                assert session.get('_flashes') == [('success', 'Welcome back, testuser!')]
 
 
 class TestMobileResponsiveness:
@@ -368,6 +403,17 @@ class TestNavigationAndLinks:
             for window in ['week', 'month', 'year', 'all']:
                 response = client.get(f'/?window={window}&category={sample_categories["benchpress"].id}')
                 assert response.status_code == 200
+    
+    def test_pwa_static_files_served(self, app, client):
+        """Manifest and service worker should be served for the PWA"""
+        for path in ['/static/manifest.json', '/static/service-worker.js', '/manifest.json']:
+            response = client.get(path)
+            assert response.status_code == 200, f"{path} was not served"
+    
+    def test_manifest_served_without_flask_view(self, app):
+        """The root manifest URL is answered by WhiteNoise, not a Flask route"""
+        pytest.importorskip('whitenoise')
+        assert '/manifest.json' not in {rule.rule for rule in app.url_map.iter_rules()}
 
 
 class TestCategoryManagement: